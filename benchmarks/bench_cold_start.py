@@ -0,0 +1,70 @@
+"""
+Cold-start cost of the serverless function: each run is a fresh Python
+process that imports main and serves its first /optimize request against
+an in-process fake Redis (imported before timing starts, so the redis
+package is never counted). Reports the median of the runs, with the
+prebuilt path table and without it (networkx fallback), and which heavy
+modules the import itself pulled in.
+
+    python benchmarks/bench_cold_start.py [--runs 7] [--trains 20]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from scenarios import make_train_data
+
+from or_module import TOPOLOGY_FILE
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+import fakeredis
+loaded = set(sys.modules)
+start = time.perf_counter()
+import main
+import dashboard_data_manager
+imported = time.perf_counter()
+heavy = sorted(name for name in ('redis', 'networkx', 'dotenv', 'multiprocessing') if name in set(sys.modules) - loaded)
+dashboard_data_manager.set_redis_client(fakeredis.FakeRedis())
+response = main.app.test_client().post('/optimize', json=json.loads(sys.stdin.read()))
+assert response.status_code == 200, response.data
+served = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'request_ms': (served - imported) * 1000,
+                  'heavy': heavy}))
+"""
+
+
+def _cold_start(payload, topology_file):
+    env = dict(os.environ, VERCEL='1')
+    env.pop('REDIS_URL', None)
+    env['TOPOLOGY_FILE'] = topology_file
+    completed = subprocess.run([sys.executable, '-c', CHILD], input=payload, capture_output=True, text=True,
+                               cwd=REPO_ROOT, env=env, check=True)
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--trains', type=int, default=20)
+    args = parser.parse_args()
+
+    payload = json.dumps({'trains': make_train_data(args.trains, seed=1), 'seed': 1})
+    print(f"{args.runs} fresh processes each, first /optimize with {args.trains} trains")
+    print(f"{'path table':>12} {'import ms':>10} {'request ms':>11} {'total ms':>9}  modules loaded by import")
+    # A copy of the topology without its path table next to it.
+    bare_topology_file = os.path.join(tempfile.mkdtemp(), os.path.basename(TOPOLOGY_FILE))
+    shutil.copy(TOPOLOGY_FILE, bare_topology_file)
+    for name, topology_file in (('prebuilt', TOPOLOGY_FILE), ('networkx', bare_topology_file)):
+        runs = [_cold_start(payload, topology_file) for _ in range(args.runs)]
+        import_ms = statistics.median(run['import_ms'] for run in runs)
+        request_ms = statistics.median(run['request_ms'] for run in runs)
+        total_ms = statistics.median(run['import_ms'] + run['request_ms'] for run in runs)
+        print(f"{name:>12} {import_ms:>10.1f} {request_ms:>11.1f} {total_ms:>9.1f}  {', '.join(runs[0]['heavy']) or '-'}")
@@ -0,0 +1,95 @@
+"""
+Load test of the /dashboard/* endpoints against an in-process fake Redis.
+
+Every Redis command sleeps for --latency-ms to stand in for the network
+round trip to the hosted Redis. Each mode is measured with the same client
+threads polling all dashboard endpoints, reporting requests/sec, 304
+responses, response body volume and class downloads from Redis:
+
+    uncached  one MGET per request, as before the worker read cache
+    ttl=0     read cache, version checked on every request
+    ttl=1     read cache, version checked at most once a second
+    ttl=1+304 as ttl=1, with clients revalidating through If-None-Match
+
+    python benchmarks/bench_dashboard_reads.py [--latency-ms 2] [--clients 8] [--requests 300]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scenarios import make_train_data
+
+import fakeredis
+
+import dashboard_data_manager
+import main
+
+ENDPOINTS = ['/dashboard/current_delays', '/dashboard/train_queue', '/dashboard/platform_status',
+             '/dashboard/predicted_conflicts', '/dashboard/train_type_data', '/dashboard/audit_data']
+
+
+class LatencyFakeRedis(fakeredis.FakeRedis):
+    latency_seconds = 0.0
+
+    def execute_command(self, *args, **options):
+        time.sleep(self.latency_seconds)
+        return super().execute_command(*args, **options)
+
+
+class UncachedRead(dashboard_data_manager.DashboardReadCache):
+    def get(self, class_name):
+        self.misses += 1
+        body, version, updated_at = dashboard_data_manager.get_redis_client().mget(
+            dashboard_data_manager.dashboard_class_key(class_name), dashboard_data_manager.REDIS_DASHBOARD_VERSION_KEY,
+            dashboard_data_manager.REDIS_DASHBOARD_UPDATED_AT_KEY)
+        return (body or dashboard_data_manager.EMPTY_DATA_CLASS_JSON,) + dashboard_data_manager._parse_version(version, updated_at)
+
+
+def _poll(requests, revalidate):
+    client = main.app.test_client()
+    etags, not_modified, sent = {}, 0, 0
+    for n in range(requests):
+        endpoint = ENDPOINTS[n % len(ENDPOINTS)]
+        headers = {'If-None-Match': etags[endpoint]} if revalidate and endpoint in etags else {}
+        response = client.get(endpoint, headers=headers)
+        sent += len(response.data)
+        if response.status_code == 304:
+            not_modified += 1
+        elif response.headers.get('ETag'):
+            etags[endpoint] = response.headers['ETag']
+    return not_modified, sent
+
+
+def _measure(cache, clients, requests, revalidate):
+    dashboard_data_manager.dashboard_read_cache = cache
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        results = list(pool.map(lambda _: _poll(requests, revalidate), range(clients)))
+    elapsed = time.perf_counter() - start
+    return (clients * requests / elapsed, sum(n for n, _ in results), sum(sent for _, sent in results) / 1024,
+            cache.misses)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency-ms', type=float, default=2.0)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--trains', type=int, default=200)
+    args = parser.parse_args()
+
+    dashboard_data_manager.set_redis_client(LatencyFakeRedis())
+    trains = make_train_data(args.trains, seed=1)
+    main.app.test_client().post('/optimize', json={'trains': trains, 'seed': 1})
+    LatencyFakeRedis.latency_seconds = args.latency_ms / 1000
+
+    print(f"{args.clients} clients x {args.requests} requests, {args.latency_ms} ms per Redis command, "
+          f"{args.trains} trains")
+    print(f"{'mode':>10} {'req/s':>9} {'304s':>6} {'body KiB':>9} {'class reads':>11}")
+    modes = [('uncached', UncachedRead(), False),
+             ('ttl=0', dashboard_data_manager.DashboardReadCache(ttl_seconds=0), False),
+             ('ttl=1', dashboard_data_manager.DashboardReadCache(ttl_seconds=1), False),
+             ('ttl=1+304', dashboard_data_manager.DashboardReadCache(ttl_seconds=1), True)]
+    for name, cache, revalidate in modes:
+        rate, not_modified, kib, misses = _measure(cache, args.clients, args.requests, revalidate)
+        print(f"{name:>10} {rate:>9.0f} {not_modified:>6} {kib:>9.0f} {misses:>11}")
@@ -0,0 +1,43 @@
+"""
+Latency and solution quality of the greedy dispatcher against annealing.
+
+Each train set is solved with mode='greedy' and with the seeded annealing
+search (which itself starts from the greedy solution when that is cheaper
+than the default paths). Cost is the annealing objective; score is the
+total delay in minutes reported by execute_module.
+
+    python benchmarks/bench_greedy.py [train_count ...]
+"""
+import contextlib
+import io
+import statistics
+import sys
+import time
+
+from scenarios import make_payload
+
+from or_module import NetworkTimeState, calculate_objective_cost, execute_module
+
+RUNS = 3
+
+
+def _solve(payload, **options):
+    timings = []
+    for _ in range(RUNS):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = execute_module(payload['trains'], payload['non_functional_segments'], **options)
+            timings.append((time.perf_counter() - start) * 1000)
+    cost = calculate_objective_cost(result['solution'], NetworkTimeState())[0]
+    return statistics.median(timings), cost, result
+
+
+if __name__ == '__main__':
+    train_counts = [int(arg) for arg in sys.argv[1:]] or [100, 500, 2000]
+    print(f"{'trains':>6} {'mode':>7} {'p50 (ms)':>9} {'cost':>12} {'score':>12} {'held':>5}")
+    for train_count in train_counts:
+        payload = make_payload(train_count, seed=train_count, arrivals_per_hour=20, closure_count=1, delay_share=0.3)
+        for mode in ('greedy', 'anneal'):
+            ms, cost, result = _solve(payload, mode=mode, seed=1)
+            held = sum(rec['action'] == 'HOLD' for rec in result['recommendations'])
+            print(f"{train_count:>6} {mode:>7} {ms:>9.1f} {cost:>12.1f} {result['score']:>12.2f} {held:>5}")
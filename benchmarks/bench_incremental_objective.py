@@ -0,0 +1,73 @@
+"""
+Incremental (checkpointed) objective evaluation versus a full replay.
+
+Every neighbour is checked against calculate_objective_cost first, so the
+script doubles as an equivalence check: it exits non-zero on any mismatch
+in cost, delays, conflicts or timelines.
+
+    python benchmarks/bench_incremental_objective.py
+"""
+import random
+import sys
+import time
+
+from scenarios import build_journeys, make_train_data
+
+from or_module import (NetworkTimeState, ObjectiveEvaluator, PathBasedSolution, apply_random_move,
+                       calculate_objective_cost, undo_move)
+
+TRAIN_COUNTS = [50, 200, 1000]
+NEIGHBOURS = 200
+
+
+def walk(journeys, network_state, evaluate, seed):
+    """Random walk of neighbours; roughly half of them are accepted."""
+    rng = random.Random(seed)
+    solution = PathBasedSolution(journeys)
+    evaluator = ObjectiveEvaluator(network_state)
+    evaluator.reset(solution)
+    for _ in range(NEIGHBOURS):
+        move = apply_random_move(solution, rng)
+        if not evaluate(evaluator, solution, move):
+            return False
+        if rng.random() < 0.5:
+            evaluator.commit()
+        else:
+            evaluator.rollback()
+            if move: undo_move(solution, move)
+    return True
+
+
+def check_equivalent(evaluator, solution, move):
+    run = evaluator.evaluate(solution, [move[0]] if move else ())
+    return run.results(solution) == calculate_objective_cost(solution, evaluator.network_state)
+
+
+def full(evaluator, solution, move):
+    calculate_objective_cost(solution, evaluator.network_state)
+    return True
+
+
+def incremental(evaluator, solution, move):
+    evaluator.evaluate(solution, [move[0]] if move else ())
+    return True
+
+
+def time_walk(journeys, network_state, evaluate, seed):
+    start = time.perf_counter()
+    walk(journeys, network_state, evaluate, seed)
+    return (time.perf_counter() - start) / NEIGHBOURS
+
+
+if __name__ == '__main__':
+    network_state = NetworkTimeState()
+    print(f"{'trains':>8} {'full (ms)':>10} {'incremental (ms)':>17} {'speedup':>9}  equivalent")
+    all_equivalent = True
+    for count in TRAIN_COUNTS:
+        journeys = build_journeys(make_train_data(count, seed=count), network_state)
+        equivalent = walk(journeys, network_state, check_equivalent, seed=count)
+        all_equivalent &= equivalent
+        full_ms = time_walk(journeys, network_state, full, seed=count) * 1000
+        incremental_ms = time_walk(journeys, network_state, incremental, seed=count) * 1000
+        print(f"{count:>8} {full_ms:>10.3f} {incremental_ms:>17.3f} {full_ms / incremental_ms:>8.1f}x  {equivalent}")
+    sys.exit(0 if all_equivalent else 1)
@@ -0,0 +1,58 @@
+"""
+Journey construction time versus train count, before and after the path catalog.
+
+"Before" rebuilds both graphs and re-enumerates paths for every train, exactly
+as TrainJourney used to. "After" starts from an empty catalog, so the first
+build of each pair is included in the measurement.
+
+    python benchmarks/bench_journey_construction.py
+"""
+import time
+from datetime import datetime
+
+from scenarios import make_train_data
+
+from or_module import (NetworkTimeState, TrainJourney, clear_path_catalogs, create_graph_from_data,
+                       find_all_possible_paths, get_path_catalog)
+
+TRAIN_COUNTS = [10, 50, 100, 300, 1000]
+CLOSURES = [['A', 'B']]
+
+
+def legacy_paths(network_state, entry_node, exit_node, non_functional_segments):
+    ideal_graph = create_graph_from_data(network_state)
+    ideal_paths = find_all_possible_paths(ideal_graph, entry_node, exit_node)
+    current_graph = create_graph_from_data(network_state, non_functional_segments)
+    return ideal_paths, find_all_possible_paths(current_graph, entry_node, exit_node)
+
+
+def build_legacy(train_data, network_state):
+    for info in train_data.values():
+        legacy_paths(network_state, info['entry_node'], info['exit_node'], CLOSURES)
+
+
+def build_catalog(train_data, network_state):
+    clear_path_catalogs()
+    catalog = get_path_catalog(network_state, CLOSURES)
+    for tid, info in train_data.items():
+        TrainJourney(tid, info['entry_node'], info['exit_node'], datetime.fromisoformat(info['scheduled_entry_time']),
+                     info['type'], network_state, non_functional_segments=CLOSURES, path_catalog=catalog)
+
+
+def best_of(fn, *args, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == '__main__':
+    network_state = NetworkTimeState()
+    print(f"{'trains':>8} {'before (ms)':>12} {'after (ms)':>12} {'speedup':>9}")
+    for count in TRAIN_COUNTS:
+        train_data = make_train_data(count, seed=count)
+        before = best_of(build_legacy, train_data, network_state)
+        after = best_of(build_catalog, train_data, network_state)
+        print(f"{count:>8} {before * 1000:>12.2f} {after * 1000:>12.2f} {before / after:>8.1f}x")
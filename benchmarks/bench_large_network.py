@@ -0,0 +1,88 @@
+"""
+Candidate paths and optimization on a large generated interlocking.
+
+Writes a topology of --tracks parallel lines of --sections segments (see
+scenarios.make_topology) to a temporary folder and points TOPOLOGY_FILE at
+it. Reports the quality of the candidates (mean travel minutes of the paths
+offered per pair) from the first simple paths networkx enumerates, as
+before, versus the k shortest, the offline path table build, and the time of a seeded
+execute_module call and of the dashboard transformation: on first use
+without a path table, on first use with one, and warm.
+
+    python benchmarks/bench_large_network.py [--tracks 16] [--sections 48] [--trains 150]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+from itertools import islice
+
+from scenarios import make_topology, make_train_data
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tracks', type=int, default=16)
+    parser.add_argument('--sections', type=int, default=48)
+    parser.add_argument('--trains', type=int, default=150)
+    args = parser.parse_args()
+
+    topology, entry_nodes, exit_nodes = make_topology(args.tracks, args.sections)
+    topology_file = os.path.join(tempfile.mkdtemp(), 'interlocking.json')
+    with open(topology_file, 'w') as f:
+        json.dump(topology, f)
+    # Read when or_module is imported.
+    os.environ['TOPOLOGY_FILE'] = topology_file
+
+    import fakeredis
+    import networkx as nx
+
+    import dashboard_data_manager
+    import or_module
+    from or_module import (MAX_CANDIDATE_PATHS, NetworkTimeState, build_path_table, clear_path_catalogs,
+                           create_graph_from_data, execute_module, find_all_possible_paths, path_table_file)
+
+    network_state = NetworkTimeState()
+    graph = create_graph_from_data(network_state)
+    print(f"{len(topology['edges'])} segments, {graph.number_of_nodes()} nodes, {len(topology['platforms'])} platforms")
+
+    def minutes(path):
+        return sum(network_state.edge_travel_times[segment] for segment in zip(path, path[1:]))
+
+    # Pairs on the same line: across lines the depth-first enumeration can take minutes per pair.
+    sample = list(zip(entry_nodes, exit_nodes))
+    first_found = [minutes(path) for u, v in sample
+                   for path in islice(nx.all_simple_paths(graph, u, v), MAX_CANDIDATE_PATHS)]
+    shortest = [minutes(path) for u, v in sample for path in find_all_possible_paths(graph, u, v)]
+    print(f"mean candidate travel minutes over {len(sample)} pairs: first enumerated "
+          f"{statistics.mean(first_found):.1f}, k shortest {statistics.mean(shortest):.1f}")
+
+    started = time.perf_counter()
+    table = build_path_table(network_state)
+    with open(path_table_file(topology_file), 'w') as f:
+        json.dump(table, f, separators=(',', ':'))
+    print(f"path table: {len(table['paths'])} pairs built in {time.perf_counter() - started:.1f} s, "
+          f"{os.path.getsize(path_table_file(topology_file)) / 1024:.0f} KiB")
+
+    trains = make_train_data(args.trains, seed=1, spacing_seconds=120, entry_nodes=entry_nodes, exit_nodes=exit_nodes)
+    dashboard_data_manager.set_redis_client(fakeredis.FakeRedis())
+    print(f"{args.trains} trains {'':>14} {'execute_module ms':>18} {'dashboard ms':>13} {'score':>10}")
+    for name in ('first, no table', 'first, table', 'warm'):
+        if name != 'warm':
+            clear_path_catalogs()
+            or_module._path_tables.clear()
+        if name == 'first, no table':
+            os.rename(path_table_file(topology_file), path_table_file(topology_file) + '.off')
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            results = execute_module(trains, seed=1)
+            optimized = time.perf_counter()
+            dashboard_data_manager.update_and_get_dashboard_state(results, trains)
+            finished = time.perf_counter()
+        if name == 'first, no table':
+            os.rename(path_table_file(topology_file) + '.off', path_table_file(topology_file))
+        print(f"{name:>30} {(optimized - started) * 1000:>18.0f} {(finished - optimized) * 1000:>13.1f} "
+              f"{results['score']:>10}")
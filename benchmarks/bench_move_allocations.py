@@ -0,0 +1,70 @@
+"""
+Per-iteration memory allocation of annealing moves, measured with tracemalloc.
+
+"deepcopy" copies a solution the way generate_neighbor used to (journeys and
+decision dicts included). "in-place move" applies a move and reverts it
+through its undo record. "move + evaluate" is a full annealing step: move,
+incremental evaluation, then commit or rollback.
+
+    python benchmarks/bench_move_allocations.py
+"""
+import copy
+import random
+import tracemalloc
+
+from scenarios import build_journeys, make_train_data
+
+from or_module import NetworkTimeState, ObjectiveEvaluator, PathBasedSolution, apply_random_move, undo_move
+
+TRAIN_COUNTS = [50, 200, 1000]
+ITERATIONS = 200
+
+
+class LegacySolution:
+    def __init__(self, solution):
+        self.train_journeys = solution.train_journeys
+        self.decisions = solution.decisions
+
+
+def peak_bytes_per_iteration(step, iterations=ITERATIONS):
+    """Mean of (peak - starting) traced memory across iterations."""
+    total = 0
+    for _ in range(iterations):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        step()
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - before
+    return total / iterations
+
+
+if __name__ == '__main__':
+    network_state = NetworkTimeState()
+    print(f"{'trains':>8} {'deepcopy (KiB)':>15} {'in-place move (KiB)':>20} {'move + evaluate (KiB)':>22}")
+    for count in TRAIN_COUNTS:
+        journeys = build_journeys(make_train_data(count, seed=count), network_state)
+        rng = random.Random(count)
+        solution = PathBasedSolution(journeys)
+        legacy = LegacySolution(solution)
+        evaluator = ObjectiveEvaluator(network_state)
+        evaluator.reset(solution)
+
+        def move_and_undo():
+            move = apply_random_move(solution, rng)
+            if move: undo_move(solution, move)
+
+        def anneal_step():
+            move = apply_random_move(solution, rng)
+            evaluator.evaluate(solution, [move[0]] if move else ())
+            if rng.random() < 0.5:
+                evaluator.commit()
+            else:
+                evaluator.rollback()
+                if move: undo_move(solution, move)
+
+        tracemalloc.start()
+        deepcopy_bytes = peak_bytes_per_iteration(lambda: copy.deepcopy(legacy))
+        move_bytes = peak_bytes_per_iteration(move_and_undo)
+        step_bytes = peak_bytes_per_iteration(anneal_step)
+        tracemalloc.stop()
+        print(f"{count:>8} {deepcopy_bytes / 1024:>15.1f} {move_bytes / 1024:>20.2f} {step_bytes / 1024:>22.1f}")
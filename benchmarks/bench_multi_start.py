@@ -0,0 +1,46 @@
+"""
+Solution quality against wall-clock time for multi-start annealing.
+
+Each configuration is run with the same seeds, so rows with equal restarts
+and exchange settings report identical scores whatever the worker count;
+only the wall-clock time changes.
+
+    python benchmarks/bench_multi_start.py [train_count]
+"""
+import os
+import sys
+import time
+
+from scenarios import make_train_data
+
+from or_module import execute_module
+
+SEEDS = [1, 2, 3]
+CONFIGURATIONS = [
+    # (restarts, workers, exchange_interval)
+    (1, 1, None),
+    (2, 1, None),
+    (2, 2, None),
+    (4, 1, None),
+    (4, 4, None),
+    (4, 4, 250),
+    (8, 8, None),
+    (8, 8, 250),
+]
+
+
+if __name__ == '__main__':
+    train_count = int(sys.argv[1]) if len(sys.argv) > 1 else 150
+    train_data = make_train_data(train_count, seed=train_count, spacing_seconds=20)
+    print(f"{train_count} trains, {os.cpu_count()} CPUs, mean over seeds {SEEDS}")
+    print(f"{'restarts':>8} {'workers':>8} {'exchange':>9} {'score':>10} {'wall (s)':>9}")
+    for restarts, workers, exchange_interval in CONFIGURATIONS:
+        scores, timings = [], []
+        for seed in SEEDS:
+            start = time.perf_counter()
+            result = execute_module(train_data, restarts=restarts, seed=seed, workers=workers,
+                                    exchange_interval=exchange_interval)
+            timings.append(time.perf_counter() - start)
+            scores.append(result['score'])
+        print(f"{restarts:>8} {workers:>8} {exchange_interval or '-':>9} "
+              f"{sum(scores) / len(scores):>10.2f} {sum(timings) / len(timings):>9.2f}")
@@ -0,0 +1,81 @@
+"""
+Scaling of the rolling-horizon search with timetable length.
+
+Trains arrive at a constant rate, so more trains means a longer day. Each
+size is solved with mode='greedy', with horizon_minutes=HORIZON_MINUTES and,
+up to --full-max trains, with the seeded annealing search over all trains at
+once. The time per train of the rolling horizon should stay about flat.
+
+The rolling horizon returns the greedy solution instead of its windows'
+when that is cheaper, which the fallback column shows.
+
+The script exits with status 1 unless a horizon longer than the whole
+timetable, one window, gives the same decisions as the seeded annealing
+search over all trains: a window's boundary must not add delay of its own.
+
+    python benchmarks/bench_rolling_horizon.py [--sizes 500 1000 2000 4000 8000] [--full-max 2000] [--time-limit-ms MS]
+"""
+import argparse
+import contextlib
+import io
+import sys
+import time
+
+from scenarios import make_payload
+
+from or_module import execute_module
+
+HORIZON_MINUTES = 60
+ARRIVALS_PER_HOUR = 20
+# Longer than any timetable make_payload builds, so all trains share one window.
+ONE_WINDOW_MINUTES = 100000
+
+
+def _solve(payload, **options):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = execute_module(payload['trains'], payload['non_functional_segments'], seed=1, **options)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def check_one_window():
+    """Mismatches between one window and the search over all trains, with the same seed."""
+    failures = []
+    for closure_count in (0, 1):
+        payload = make_payload(60, seed=1, closure_count=closure_count)
+        _, full = _solve(payload)
+        _, rolling = _solve(payload, horizon_minutes=ONE_WINDOW_MINUTES)
+        if rolling['search']['windows']['count'] != 1:
+            failures.append(f"{closure_count} closures: {rolling['search']['windows']['count']} windows, expected 1")
+        elif (rolling['score'], rolling['recommendations']) != (full['score'], full['recommendations']):
+            failures.append(f"{closure_count} closures: one window scores {rolling['score']}, "
+                            f"the search over all trains {full['score']}")
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 1000, 2000, 4000, 8000])
+    parser.add_argument('--full-max', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--time-limit-ms', type=int, default=None)
+    args = parser.parse_args()
+
+    print(f"{'trains':>6} {'search':>8} {'windows':>7} {'ms':>9} {'ms/train':>9} {'score':>14} {'fallback':>8}")
+    for train_count in args.sizes:
+        payload = make_payload(train_count, seed=train_count, arrivals_per_hour=ARRIVALS_PER_HOUR, delay_share=0.3)
+        runs = [('greedy', dict(mode='greedy')),
+                ('rolling', dict(horizon_minutes=HORIZON_MINUTES, workers=args.workers, time_limit_ms=args.time_limit_ms))]
+        if train_count <= args.full_max:
+            runs.append(('full', dict(workers=args.workers, time_limit_ms=args.time_limit_ms)))
+        for name, options in runs:
+            ms, result = _solve(payload, **options)
+            windows = result['search']['windows']
+            print(f"{train_count:>6} {name:>8} {windows['count'] if windows else '-':>7} {ms:>9.0f} "
+                  f"{ms / train_count:>9.2f} {result['score']:>14.2f} {str(windows['fallback']) if windows else '-':>8}",
+                  flush=True)
+    failures = check_one_window()
+    print(f"one window matches the search over all trains: {'no' if failures else 'yes'}")
+    for failure in failures:
+        print(f"  {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,185 @@
+"""
+Reproducible performance suite: wall time, peak traced memory and solution
+quality of execute_module, calculate_objective_cost,
+update_and_get_dashboard_state and the Flask endpoints, from 10 to 2000
+trains, against an in-process fake Redis. Every payload and search is
+seeded, so scores only change when the optimizer does.
+
+    python benchmarks/bench_suite.py                # run and compare with baseline.json
+    python benchmarks/bench_suite.py --save         # run and write baseline.json
+    python benchmarks/bench_suite.py --sizes 10 100
+
+Exits with status 1 if a case is slower, larger or worse than the baseline
+beyond the tolerances below. Times depend on the machine, so compare
+against a baseline saved on the same one.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from scenarios import make_payload
+
+# Searches through /optimize must not hit the wall-clock cap, or their
+# results would depend on the machine.
+os.environ.setdefault('OPTIMIZE_TIME_LIMIT_MS', '3600000')
+
+import fakeredis
+
+import dashboard_data_manager
+import main
+from or_module import NetworkTimeState, calculate_objective_cost, execute_module
+from result_cache import result_cache
+
+SIZES = (10, 100, 500, 2000)
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# A case regresses when its median time exceeds the baseline by this factor
+# and by more than the slack, its peak memory by this factor, or its score
+# by this share.
+TIME_TOLERANCE = 1.5
+TIME_SLACK_MS = 2.0
+MEMORY_TOLERANCE = 1.2
+SCORE_TOLERANCE = 0.01
+
+SEED = 1
+DASHBOARD_READS = 60
+
+
+def _payload(train_count):
+    return make_payload(train_count, seed=train_count, arrivals_per_hour=20, closure_count=1, delay_share=0.3)
+
+
+def _measure(run, repeat):
+    """(median ms, peak traced MiB, last result) of `run()`; memory comes from one extra traced call."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        times.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return round(statistics.median(times), 3), round(peak / 2 ** 20, 3), result
+
+
+def _reset_caches():
+    result_cache.entries.clear()
+    dashboard_data_manager.get_redis_client().flushall()
+
+
+def _optimize(client, payload):
+    _reset_caches()
+    response = client.post('/optimize', json=dict(payload, seed=SEED))
+    assert response.status_code == 200, response.data
+    return response.get_json()
+
+
+def _read_dashboard(client):
+    for n in range(DASHBOARD_READS):
+        client.get(['/dashboard/current_delays', '/dashboard/train_queue', '/dashboard/platform_status',
+                    '/dashboard/predicted_conflicts', '/dashboard/train_type_data', '/dashboard/audit_data'][n % 6])
+
+
+def run_suite(sizes, repeat):
+    dashboard_data_manager.set_redis_client(fakeredis.FakeRedis())
+    client = main.app.test_client()
+    network_state = NetworkTimeState()
+    records = []
+    for train_count in sizes:
+        payload = _payload(train_count)
+        trains, closures = payload['trains'], payload['non_functional_segments']
+
+        ms, mib, results = _measure(lambda: execute_module(trains, closures, seed=SEED), repeat)
+        records.append({'case': 'execute_module', 'trains': train_count, 'ms': ms, 'peak_mib': mib,
+                        'score': results['score']})
+
+        solution = results['solution']
+        ms, mib, _ = _measure(lambda: calculate_objective_cost(solution, network_state), repeat)
+        records.append({'case': 'calculate_objective_cost', 'trains': train_count, 'ms': ms, 'peak_mib': mib})
+
+        ms, mib, _ = _measure(lambda: dashboard_data_manager.update_and_get_dashboard_state(results, trains), repeat)
+        records.append({'case': 'update_and_get_dashboard_state', 'trains': train_count, 'ms': ms, 'peak_mib': mib})
+
+        ms, mib, response = _measure(lambda: _optimize(client, payload), repeat)
+        records.append({'case': 'POST /optimize', 'trains': train_count, 'ms': ms, 'peak_mib': mib,
+                        'score': response['score']})
+
+        ms, mib, _ = _measure(lambda: _read_dashboard(client), repeat)
+        records.append({'case': 'GET /dashboard/*', 'trains': train_count, 'ms': round(ms / DASHBOARD_READS, 3),
+                        'peak_mib': mib})
+        print(f"  {train_count} trains done", file=sys.stderr)
+    return records
+
+
+def _environment():
+    return {'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count()}
+
+
+def compare(records, baseline):
+    """Returns the regressions of `records` against the baseline records, as printable strings."""
+    previous = {(record['case'], record['trains']): record for record in baseline['results']}
+    regressions = []
+    for record in records:
+        old = previous.get((record['case'], record['trains']))
+        if old is None:
+            continue
+        name = f"{record['case']} @ {record['trains']}"
+        if record['ms'] > old['ms'] * TIME_TOLERANCE and record['ms'] - old['ms'] > TIME_SLACK_MS:
+            regressions.append(f"{name}: {record['ms']:.1f} ms, baseline {old['ms']:.1f} ms")
+        if record['peak_mib'] > old['peak_mib'] * MEMORY_TOLERANCE:
+            regressions.append(f"{name}: {record['peak_mib']:.2f} MiB, baseline {old['peak_mib']:.2f} MiB")
+        if 'score' in old and record['score'] > old['score'] * (1 + SCORE_TOLERANCE) + 1e-9:
+            regressions.append(f"{name}: score {record['score']}, baseline {old['score']}")
+    return regressions
+
+
+def _print_table(records, baseline):
+    previous = {(record['case'], record['trains']): record for record in baseline['results']} if baseline else {}
+    print(f"{'case':>30} {'trains':>6} {'ms':>10} {'vs base':>8} {'peak MiB':>9} {'score':>12}")
+    for record in records:
+        old = previous.get((record['case'], record['trains']))
+        ratio = f"{record['ms'] / old['ms']:.2f}x" if old and old['ms'] else '-'
+        score = record.get('score', '')
+        print(f"{record['case']:>30} {record['trains']:>6} {record['ms']:>10.2f} {ratio:>8} "
+              f"{record['peak_mib']:>9.2f} {score:>12}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', action='store_true', help="write the results to the baseline file")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    args = parser.parse_args()
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['environment'] != _environment():
+            print(f"WARNING: Baseline was recorded on {baseline['environment']}, not {_environment()}",
+                  file=sys.stderr)
+
+    # The modules under test log every state write; keep the table readable.
+    with contextlib.redirect_stdout(io.StringIO()):
+        records = run_suite(args.sizes, args.repeat)
+    _print_table(records, baseline)
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump({'environment': _environment(), 'results': records}, f, indent=1)
+            f.write('\n')
+        print(f"Wrote {len(records)} results to {args.baseline}")
+    elif baseline:
+        regressions = compare(records, baseline)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        sys.exit(1 if regressions else 0)
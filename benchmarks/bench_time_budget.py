@@ -0,0 +1,45 @@
+"""
+Latency and solution quality of the time-budgeted annealing schedule.
+
+For each budget the wall-clock time of execute_module must stay under the
+budget; the fixed schedule is shown first for comparison. Exits non-zero
+if any budgeted run overruns.
+
+    python benchmarks/bench_time_budget.py [train_count ...]
+"""
+import sys
+import time
+
+from scenarios import make_train_data
+
+from or_module import execute_module
+
+BUDGETS_MS = [250, 1000, 4000]
+RUNS = 5
+
+
+def _run(train_data, **options):
+    start = time.perf_counter()
+    result = execute_module(train_data, **options)
+    return (time.perf_counter() - start) * 1000, result
+
+
+if __name__ == '__main__':
+    train_counts = [int(arg) for arg in sys.argv[1:]] or [50, 300, 1000]
+    overruns = 0
+    print(f"{'trains':>6} {'budget (ms)':>11} {'score':>12} {'p50 (ms)':>9} {'max (ms)':>9} {'iterations':>10} {'stop':>12}")
+    for train_count in train_counts:
+        train_data = make_train_data(train_count, seed=train_count, spacing_seconds=20)
+        for budget_ms in [None] + BUDGETS_MS:
+            runs = [_run(train_data, time_budget_ms=budget_ms) for _ in range(RUNS)]
+            timings = sorted(elapsed for elapsed, _ in runs)
+            scores = [result['score'] for _, result in runs]
+            search = runs[-1][1]['search']
+            if budget_ms is not None:
+                overruns += sum(elapsed > budget_ms for elapsed in timings)
+            print(f"{train_count:>6} {budget_ms or 'fixed':>11} {sum(scores) / len(scores):>12.2f} "
+                  f"{timings[len(timings) // 2]:>9.0f} {timings[-1]:>9.0f} {search['iterations']:>10} "
+                  f"{search['stop_reason']:>12}")
+    if overruns:
+        print(f"{overruns} budgeted runs exceeded their budget")
+        sys.exit(1)
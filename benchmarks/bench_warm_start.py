@@ -0,0 +1,52 @@
+"""
+Latency and solution quality of warm-started re-optimization.
+
+A timetable is updated several times, each update adding two trains and
+removing the oldest one (or closing a segment). Every update is solved both
+from scratch and warm-started from the previous warm-started solution, with
+the same seed.
+
+    python benchmarks/bench_warm_start.py [train_count ...]
+"""
+import sys
+import time
+
+from scenarios import make_train_data
+
+from or_module import execute_module
+
+UPDATES = 6
+CLOSURE = [['A', 'B'], ['B', 'A']]
+
+
+def _updates(train_count):
+    """(train_data, closures) per update: a sliding window over a longer timetable."""
+    timetable = sorted(make_train_data(train_count + 2 * UPDATES, seed=train_count, spacing_seconds=30).items(),
+                       key=lambda item: item[1]['scheduled_entry_time'])
+    for update in range(UPDATES):
+        window = dict(timetable[update:train_count + 2 * update])
+        yield window, CLOSURE if update == UPDATES // 2 else None
+
+
+def _solve(train_data, closures, **options):
+    start = time.perf_counter()
+    result = execute_module(train_data, closures, **options)
+    return (time.perf_counter() - start) * 1000, result
+
+
+if __name__ == '__main__':
+    train_counts = [int(arg) for arg in sys.argv[1:]] or [50, 200]
+    print(f"{'trains':>6} {'update':>6} {'cold score':>11} {'warm score':>11} {'cold (ms)':>10} {'warm (ms)':>10} {'seeded':>6}")
+    for train_count in train_counts:
+        previous, totals = None, [0, 0, 0, 0]
+        for update, (train_data, closures) in enumerate(_updates(train_count)):
+            cold_ms, cold = _solve(train_data, closures, seed=update)
+            warm_ms, warm = _solve(train_data, closures, seed=update, warm_start=previous)
+            previous = {rec['train_id']: {'action': rec['action'], 'path': rec['path']} for rec in warm['recommendations']}
+            seeded = warm['search']['warm_start']['seeded'] if warm['search']['warm_start'] else '-'
+            print(f"{train_count:>6} {update:>6} {cold['score']:>11.2f} {warm['score']:>11.2f} {cold_ms:>10.0f} "
+                  f"{warm_ms:>10.0f} {seeded:>6}")
+            if update:
+                totals = [total + value for total, value in zip(totals, (cold['score'], warm['score'], cold_ms, warm_ms))]
+        print(f"{train_count:>6} {'mean':>6} " + " ".join(f"{value / (UPDATES - 1):>{width}.{digits}f}" for value, width, digits
+                                                         in zip(totals, (11, 11, 10, 10), (2, 2, 0, 0))))
@@ -0,0 +1,141 @@
+"""
+Paging of /dashboard/audit_data against an in-process fake Redis.
+
+A stream of known entries is written directly, then read back through the
+endpoint: cursor paging, the train_id filter, since/until, the
+AUDIT_MAX_SCAN cutoff of filtered pages, and the 400 answers for malformed
+query strings. The script exits non-zero on any mismatch.
+
+    python benchmarks/check_audit_pages.py
+"""
+import json
+import sys
+from datetime import datetime
+
+import fakeredis
+
+import scenarios  # noqa: F401 (puts the repository root on sys.path)
+
+import dashboard_data_manager
+import main
+
+ENTRY_COUNT = 250
+TRAIN_IDS = ['T1', 'T2', 'T3', 'T4', 'T5']
+# Stream IDs start here, in milliseconds; two entries share each millisecond.
+FIRST_MILLISECOND = 1761748200000
+# Only the oldest entries belong to this train, so filtered pages must scan past the rest.
+RARE_TRAIN_ID = 'T_rare'
+RARE_ENTRIES = 3
+
+
+def _write_stream(redis_client):
+    """Appends the entries oldest first; returns their (stream ID, id, trainId), newest first."""
+    entries = []
+    for n in range(ENTRY_COUNT):
+        stream_id = f"{FIRST_MILLISECOND + n // 2 * 1000}-{n % 2}"
+        train_id = RARE_TRAIN_ID if n < RARE_ENTRIES else TRAIN_IDS[n % len(TRAIN_IDS)]
+        body = json.dumps({'id': f"AUD_{n}", 'trainId': train_id}, separators=(',', ':'))
+        redis_client.xadd(dashboard_data_manager.REDIS_AUDIT_STREAM_KEY, {'trainId': train_id, 'entry': body},
+                          id=stream_id)
+        entries.append((stream_id, f"AUD_{n}", train_id))
+    return entries[::-1]
+
+
+def _iso(stream_id):
+    return datetime.fromtimestamp(int(stream_id.partition('-')[0]) / 1000).isoformat(timespec='milliseconds')
+
+
+def _read_all(client, **query):
+    """Follows X-Next-Cursor from the first page; returns the entry ids and the number of pages."""
+    ids, pages, cursor = [], 0, None
+    while True:
+        response = client.get('/dashboard/audit_data', query_string=dict(query, **({'cursor': cursor} if cursor else {})))
+        if response.status_code != 200:
+            raise AssertionError(f"{query}: status {response.status_code}")
+        ids += [entry['id'] for entry in response.get_json()]
+        pages += 1
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            return ids, pages
+        if pages > ENTRY_COUNT:
+            raise AssertionError(f"{query}: the cursor never ran out")
+
+
+def check_paging(client, entries):
+    ids, pages = _read_all(client, limit=7)
+    expected = [entry_id for _, entry_id, _ in entries]
+    return [] if ids == expected else [f"limit=7 over {pages} pages returned {len(ids)} entries, "
+                                       f"{len(set(ids))} distinct, expected {len(expected)} newest first"]
+
+
+def check_train_filter(client, entries):
+    failures = []
+    # A limit above what one batch of AUDIT_PAGE_SIZE entries holds makes a page read several batches.
+    for train_id, limit in ((TRAIN_IDS[0], 30), (TRAIN_IDS[1], 3), (RARE_TRAIN_ID, 3)):
+        ids, _ = _read_all(client, limit=limit, train_id=train_id)
+        expected = [entry_id for _, entry_id, entry_train in entries if entry_train == train_id]
+        if ids != expected:
+            failures.append(f"train_id={train_id} returned {ids[:5]}..., expected {expected[:5]}...")
+    return failures
+
+
+def check_time_range(client, entries):
+    failures = []
+    # Both bounds fall on a millisecond shared by two entries, which must both be included.
+    since, until = entries[-40][0], entries[20][0]
+    for query in ({'since': _iso(since)}, {'until': _iso(until)}, {'since': _iso(since), 'until': _iso(until)}):
+        low = int(since.partition('-')[0]) if 'since' in query else 0
+        high = int(until.partition('-')[0]) if 'until' in query else float('inf')
+        expected = [entry_id for stream_id, entry_id, _ in entries if low <= int(stream_id.partition('-')[0]) <= high]
+        ids, _ = _read_all(client, limit=9, **query)
+        if ids != expected:
+            failures.append(f"{query} returned {len(ids)} entries, expected {len(expected)}")
+    response = client.get('/dashboard/audit_data', query_string={'limit': 1})
+    recorded_at = response.get_json()[0]['recordedAt']
+    if recorded_at != _iso(entries[0][0]):
+        failures.append(f"recordedAt is {recorded_at}, expected {_iso(entries[0][0])}")
+    return failures
+
+
+def check_scan_cutoff(client, entries):
+    failures = []
+    max_scan = dashboard_data_manager.AUDIT_MAX_SCAN
+    dashboard_data_manager.AUDIT_MAX_SCAN = 20
+    try:
+        response = client.get('/dashboard/audit_data', query_string={'train_id': RARE_TRAIN_ID, 'limit': 10})
+        if response.get_json() != [] or response.headers.get('X-Next-Cursor') != entries[19][0]:
+            failures.append(f"first filtered page should be empty with cursor {entries[19][0]}, got "
+                            f"{len(response.get_json())} entries and cursor {response.headers.get('X-Next-Cursor')}")
+        ids, pages = _read_all(client, limit=10, train_id=RARE_TRAIN_ID)
+        expected = [entry_id for _, entry_id, train_id in entries if train_id == RARE_TRAIN_ID]
+        if ids != expected or pages != -(-ENTRY_COUNT // 20):
+            failures.append(f"AUDIT_MAX_SCAN=20 returned {ids} over {pages} pages, expected {expected} "
+                            f"over {-(-ENTRY_COUNT // 20)}")
+    finally:
+        dashboard_data_manager.AUDIT_MAX_SCAN = max_scan
+    return failures
+
+
+def check_bad_queries(client, entries):
+    failures = []
+    for query in ({'limit': '0'}, {'limit': '1001'}, {'limit': 'x'}, {'limit': '-1'}, {'cursor': 'abc'},
+                  {'cursor': '1-x'}, {'cursor': '-1'}, {'since': 'yesterday'}, {'until': '2025-13-01'}):
+        response = client.get('/dashboard/audit_data', query_string=query)
+        if response.status_code != 400 or 'error' not in (response.get_json() or {}):
+            failures.append(f"{query} answered {response.status_code}, expected 400 with an error")
+    return failures
+
+
+if __name__ == '__main__':
+    redis_client = fakeredis.FakeRedis()
+    dashboard_data_manager.set_redis_client(redis_client)
+    entries = _write_stream(redis_client)
+    client = main.app.test_client()
+    failed = False
+    for check in (check_paging, check_train_filter, check_time_range, check_scan_cutoff, check_bad_queries):
+        failures = check(client, entries)
+        print(f"{check.__name__:<20} {'FAIL' if failures else 'ok'}")
+        for failure in failures:
+            print(f"  {failure}")
+        failed = failed or bool(failures)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,174 @@
+"""
+Events of /dashboard/stream against an in-process fake Redis.
+
+State writes go through update_and_get_dashboard_state while one stream is
+read chunk by chunk: the initial snapshot, one update per write holding
+exactly the classes that write changed, keepalives, resuming from
+Last-Event-ID, no repeat of an update the snapshot already holds, and a
+fresh snapshot after a missed version. The script
+exits non-zero on any mismatch.
+
+    python benchmarks/check_dashboard_stream.py
+"""
+import contextlib
+import io
+import json
+import sys
+
+import fakeredis
+
+from scenarios import make_payload
+
+import dashboard_data_manager
+import main
+from dashboard_data_manager import DASHBOARD_CLASSES, dashboard_class_key, update_and_get_dashboard_state
+from or_module import execute_module
+
+# Short enough that a read without a write returns a keepalive at once.
+HEARTBEAT_SECONDS = 0.05
+
+
+def _results(seed):
+    payload = make_payload(12, seed=seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return execute_module(payload['trains'], payload['non_functional_segments'], mode='greedy'), payload['trains']
+
+
+def _write(results):
+    """One state write; returns {class: value} of the classes it changed."""
+    redis_client = dashboard_data_manager.get_redis_client()
+    keys = [dashboard_class_key(class_name) for class_name in DASHBOARD_CLASSES]
+    before = redis_client.mget(keys)
+    with contextlib.redirect_stdout(io.StringIO()):
+        update_and_get_dashboard_state(*results)
+    after = redis_client.mget(keys)
+    return {class_name: json.loads(body) for class_name, body, previous in zip(DASHBOARD_CLASSES, after, before)
+            if body != previous}
+
+
+def _stored_classes():
+    bodies = dashboard_data_manager.get_redis_client().mget(
+        [dashboard_class_key(class_name) for class_name in DASHBOARD_CLASSES])
+    return {class_name: json.loads(body) for class_name, body in zip(DASHBOARD_CLASSES, bodies)}
+
+
+def _version():
+    return int(dashboard_data_manager.get_redis_client().get(dashboard_data_manager.REDIS_DASHBOARD_VERSION_KEY))
+
+
+class _Stream:
+    """One /dashboard/stream response, read one event at a time."""
+    def __init__(self, client, last_event_id=None):
+        headers = {'Last-Event-ID': str(last_event_id)} if last_event_id is not None else {}
+        self.response = client.get('/dashboard/stream', headers=headers, buffered=False)
+        self.chunks = iter(self.response.response)
+        retry = next(self.chunks)
+        if not retry.startswith(b"retry:"):
+            raise AssertionError(f"stream starts with {retry!r}, expected a retry line")
+
+    def next_event(self):
+        """(event, id, data) of the next chunk, or ('keepalive', None, None)."""
+        chunk = next(self.chunks)
+        if chunk == b": keepalive\n\n":
+            return 'keepalive', None, None
+        fields = dict(line.split(b": ", 1) for line in chunk.rstrip(b"\n").split(b"\n"))
+        return fields[b"event"].decode(), int(fields[b"id"]), json.loads(fields[b"data"])
+
+    def close(self):
+        self.response.close()
+
+
+def _expect(failures, name, got, event, version, classes):
+    kind, event_id, data = got
+    if kind != event or event_id != version:
+        failures.append(f"{name}: got {kind} {event_id}, expected {event} {version}")
+    elif data['version'] != version or data['classes'] != classes:
+        failures.append(f"{name}: {event} {version} holds {sorted(data['classes'])}, expected {sorted(classes)}")
+
+
+def check_snapshot_and_updates(client, results):
+    failures = []
+    stream = _Stream(client)
+    try:
+        _expect(failures, 'snapshot', stream.next_event(), 'snapshot', _version(), _stored_classes())
+        for name, write in (('changed write', results[1]), ('same write', results[1]), ('changed back', results[0])):
+            changed = _write(write)
+            _expect(failures, name, stream.next_event(), 'update', _version(), changed)
+        got = stream.next_event()
+        if got[0] != 'keepalive':
+            failures.append(f"idle stream sent {got[0]} {got[1]}, expected a keepalive")
+    finally:
+        stream.close()
+    return failures
+
+
+def check_resume(client, results):
+    failures = []
+    # A client holding the current version gets no snapshot, only later updates.
+    stream = _Stream(client, last_event_id=_version())
+    try:
+        got = stream.next_event()
+        if got[0] != 'keepalive':
+            failures.append(f"up-to-date Last-Event-ID got {got[0]} {got[1]}, expected a keepalive")
+        changed = _write(results[1])
+        _expect(failures, 'update after resume', stream.next_event(), 'update', _version(), changed)
+    finally:
+        stream.close()
+    # A client behind the current version gets a snapshot first.
+    stream = _Stream(client, last_event_id=_version() - 2)
+    try:
+        _expect(failures, 'stale Last-Event-ID', stream.next_event(), 'snapshot', _version(), _stored_classes())
+    finally:
+        stream.close()
+    return failures
+
+
+def check_write_before_snapshot(client, results):
+    failures = []
+    # The stream subscribes before it reads the snapshot, so this write's
+    # update is queued behind a snapshot that already holds it.
+    stream = _Stream(client)
+    try:
+        _write(results[0])
+        _expect(failures, 'snapshot after write', stream.next_event(), 'snapshot', _version(), _stored_classes())
+        got = stream.next_event()
+        if got[0] != 'keepalive':
+            failures.append(f"update covered by the snapshot was sent again as {got[0]} {got[1]}")
+    finally:
+        stream.close()
+    return failures
+
+
+def check_missed_version(client, results):
+    failures = []
+    stream = _Stream(client, last_event_id=_version())
+    try:
+        # The snapshot is only read with the first event, so wait for the stream to be idle first.
+        got = stream.next_event()
+        if got[0] != 'keepalive':
+            failures.append(f"up-to-date Last-Event-ID got {got[0]} {got[1]}, expected a keepalive")
+        # A write whose announcement was lost: only the version moves on.
+        dashboard_data_manager.get_redis_client().incr(dashboard_data_manager.REDIS_DASHBOARD_VERSION_KEY)
+        _write(results[0])
+        _expect(failures, 'missed version', stream.next_event(), 'snapshot', _version(), _stored_classes())
+        changed = _write(results[1])
+        _expect(failures, 'update after snapshot', stream.next_event(), 'update', _version(), changed)
+    finally:
+        stream.close()
+    return failures
+
+
+if __name__ == '__main__':
+    dashboard_data_manager.set_redis_client(fakeredis.FakeRedis())
+    main.DASHBOARD_STREAM_HEARTBEAT_SECONDS = HEARTBEAT_SECONDS
+    results = [_results(seed) for seed in (1, 2)]
+    _write(results[0])
+    client = main.app.test_client()
+    failed = False
+    for check in (check_snapshot_and_updates, check_resume, check_write_before_snapshot, check_missed_version):
+        failures = check(client, results)
+        print(f"{check.__name__:<27} {'FAIL' if failures else 'ok'}")
+        for failure in failures:
+            print(f"  {failure}")
+        failed = failed or bool(failures)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,195 @@
+"""
+The /optimize/jobs queue against an in-process fake Redis.
+
+Jobs are submitted through the endpoint and run by OptimizationJobs.work(),
+as the `python optimization_jobs.py` worker does: coalescing of identical
+requests, the 429 queue limit, the TTL of queued, running and finished
+jobs, heartbeats while a job runs, and the restart of failed and stale
+jobs. The script exits non-zero on any mismatch.
+
+    python benchmarks/check_optimization_jobs.py
+"""
+import contextlib
+import io
+import sys
+import time
+
+import fakeredis
+
+from scenarios import make_payload
+
+import dashboard_data_manager
+import main
+import optimization_jobs
+from optimization_jobs import (OPTIMIZE_JOB_STALE_SECONDS, OPTIMIZE_JOB_TTL_SECONDS, REDIS_JOB_QUEUE_KEY,
+                               OptimizationJobs, get_job, job_key)
+
+# Short enough that a job sleeping a few intervals sees several heartbeats.
+HEARTBEAT_SECONDS = 0.05
+
+
+def _body(seed):
+    payload = make_payload(10, seed=seed)
+    return {'trains': payload['trains'], 'mode': 'greedy', 'warm_start': False}
+
+
+def _submit(client, body):
+    response = client.post('/optimize/jobs', json=body)
+    return response.status_code, response.get_json(), response.headers
+
+
+def _redis():
+    return dashboard_data_manager.get_redis_client()
+
+
+def _queue():
+    return [job_id.decode() for job_id in _redis().lrange(REDIS_JOB_QUEUE_KEY, 0, -1)]
+
+
+def _drain():
+    with contextlib.redirect_stdout(io.StringIO()):
+        main.optimization_jobs.work(timeout=0.1)
+
+
+def _ttl_ok(failures, name, job_id):
+    ttl = _redis().ttl(job_key(job_id))
+    if not 0 < ttl <= OPTIMIZE_JOB_TTL_SECONDS:
+        failures.append(f"{name}: TTL is {ttl}, expected 1..{OPTIMIZE_JOB_TTL_SECONDS}")
+
+
+def check_coalescing(client):
+    failures = []
+    status, first, headers = _submit(client, _body(1))
+    job_id = first['job_id']
+    if status != 202 or first['coalesced'] or headers.get('Location') != f"/optimize/jobs/{job_id}":
+        failures.append(f"first submission answered {status} {first}")
+    _ttl_ok(failures, 'queued job', job_id)
+    status, second, _ = _submit(client, _body(1))
+    if status != 202 or not second['coalesced'] or second['job_id'] != job_id:
+        failures.append(f"identical submission answered {status} {second}, expected to join {job_id}")
+    if _queue() != [job_id]:
+        failures.append(f"queue holds {_queue()}, expected [{job_id}]")
+    if get_job(job_id)['status'] != 'queued':
+        failures.append(f"job is {get_job(job_id)['status']} before any worker ran, expected queued")
+    _drain()
+    job = get_job(job_id)
+    if job['status'] != 'done' or 'score' not in job.get('result', {}):
+        failures.append(f"job is {job['status']} after the worker ran, expected done with a result")
+    if _redis().hexists(job_key(job_id), 'request'):
+        failures.append("finished job still stores its request")
+    _ttl_ok(failures, 'finished job', job_id)
+    status, third, _ = _submit(client, _body(1))
+    if not third['coalesced'] or _queue():
+        failures.append(f"submission of a finished job answered {third} and queued {_queue()}")
+    return failures
+
+
+def check_queue_limit(client):
+    failures = []
+    queue_limit = main.optimization_jobs.queue_limit
+    main.optimization_jobs.queue_limit = 2
+    try:
+        job_count = len(_redis().keys(job_key('*')))
+        answers = [_submit(client, _body(seed)) for seed in (11, 12, 13)]
+        if [status for status, _, _ in answers] != [202, 202, 429]:
+            failures.append(f"three submissions with a limit of 2 answered {[status for status, _, _ in answers]}")
+        if answers[2][2].get('Retry-After') != str(main.JOB_RETRY_AFTER_SECONDS):
+            failures.append(f"429 carries Retry-After {answers[2][2].get('Retry-After')}")
+        if len(_queue()) != 2 or len(_redis().keys(job_key('*'))) != job_count + 2:
+            failures.append(f"rejected job left state behind; queue holds {len(_queue())} jobs")
+        # Joining an existing job does not need room in the queue.
+        if _submit(client, _body(11))[0] != 202:
+            failures.append("identical submission was rejected by a full queue")
+    finally:
+        main.optimization_jobs.queue_limit = queue_limit
+    _drain()
+    return failures
+
+
+def _age(job_id, seconds):
+    _redis().hset(job_key(job_id), 'heartbeat_at', repr(time.time() - seconds))
+
+
+def check_stale_restart(client):
+    failures = []
+    _, submitted, _ = _submit(client, _body(21))
+    job_id = submitted['job_id']
+    # Old but still waiting in the queue: alive.
+    _age(job_id, OPTIMIZE_JOB_STALE_SECONDS + 5)
+    if get_job(job_id)['status'] != 'queued' or not _submit(client, _body(21))[1]['coalesced']:
+        failures.append("a queued job still in the queue was treated as stale")
+    # Popped by a worker that stopped before marking it running.
+    _redis().lrem(REDIS_JOB_QUEUE_KEY, 0, job_id)
+    job = get_job(job_id)
+    if job['status'] != 'failed' or 'error' not in job:
+        failures.append(f"popped queued job without a worker is {job['status']}, expected failed")
+    if _submit(client, _body(21))[1]['coalesced'] or _queue() != [job_id]:
+        failures.append(f"stale queued job was not queued again; queue holds {_queue()}")
+    # Running, but its worker stopped sending heartbeats.
+    _redis().hset(job_key(job_id), 'status', 'running')
+    _redis().lrem(REDIS_JOB_QUEUE_KEY, 0, job_id)
+    _age(job_id, OPTIMIZE_JOB_STALE_SECONDS - 5)
+    if get_job(job_id)['status'] != 'running' or not _submit(client, _body(21))[1]['coalesced']:
+        failures.append("a running job with a recent heartbeat was treated as stale")
+    _age(job_id, OPTIMIZE_JOB_STALE_SECONDS + 5)
+    if get_job(job_id)['status'] != 'failed':
+        failures.append(f"running job with an old heartbeat is {get_job(job_id)['status']}, expected failed")
+    status, resubmitted, _ = _submit(client, _body(21))
+    if resubmitted['coalesced'] or _queue() != [job_id] or get_job(job_id)['status'] != 'queued':
+        failures.append(f"stale running job was not queued again: {resubmitted}, queue {_queue()}")
+    _ttl_ok(failures, 'restarted job', job_id)
+    _drain()
+    if get_job(job_id)['status'] != 'done':
+        failures.append(f"restarted job is {get_job(job_id)['status']} after the worker ran, expected done")
+    return failures
+
+
+def check_heartbeat_and_failure(client):
+    failures = []
+    heartbeats = []
+
+    def run(seconds, fail, progress=None):
+        started = float(_redis().hget(job_key(job_ids[0]), 'heartbeat_at'))
+        time.sleep(seconds)
+        heartbeats.append(float(_redis().hget(job_key(job_ids[0]), 'heartbeat_at')) - started)
+        if fail:
+            raise ValueError("no feasible schedule")
+        return {'score': 0}
+
+    jobs = OptimizationJobs(run)
+    job_ids = ['slow']
+    jobs.submit('slow', [HEARTBEAT_SECONDS * 6, False])
+    with contextlib.redirect_stdout(io.StringIO()):
+        jobs.work(timeout=0.1)
+    if not heartbeats or heartbeats[0] <= 0:
+        failures.append(f"heartbeat_at did not advance while the job ran: {heartbeats}")
+    _ttl_ok(failures, 'job after heartbeats', 'slow')
+
+    job_ids[0] = 'failing'
+    jobs.submit('failing', [0, True])
+    with contextlib.redirect_stdout(io.StringIO()):
+        jobs.work(timeout=0.1)
+    job = get_job('failing')
+    if job['status'] != 'failed' or job.get('error') != "no feasible schedule":
+        failures.append(f"failing job is {job['status']} with error {job.get('error')}")
+    if not jobs.submit('failing', [0, False]):
+        failures.append("submission of a failed job joined it instead of starting again")
+    with contextlib.redirect_stdout(io.StringIO()):
+        jobs.work(timeout=0.1)
+    if get_job('failing')['status'] != 'done':
+        failures.append(f"restarted failed job is {get_job('failing')['status']}, expected done")
+    return failures
+
+
+if __name__ == '__main__':
+    dashboard_data_manager.set_redis_client(fakeredis.FakeRedis())
+    optimization_jobs.JOB_HEARTBEAT_INTERVAL_SECONDS = HEARTBEAT_SECONDS
+    client = main.app.test_client()
+    failed = False
+    for check in (check_coalescing, check_queue_limit, check_stale_restart, check_heartbeat_and_failure):
+        failures = check(client)
+        print(f"{check.__name__:<27} {'FAIL' if failures else 'ok'}")
+        for failure in failures:
+            print(f"  {failure}")
+        failed = failed or bool(failures)
+    sys.exit(1 if failed else 0)
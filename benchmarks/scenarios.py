@@ -0,0 +1,116 @@
+"""
+Synthetic /optimize payloads for the benchmark scripts in this folder.
+"""
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+# Benchmarks are run as plain scripts from the repo root or this folder.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENTRY_NODES = [f'Entry_{i}' for i in range(1, 7)]
+EXIT_NODES = [f'Entry_{i}' for i in range(7, 13)]
+TRAIN_TYPES = ['Passenger', 'Local', 'Freight', 'Special']
+DEFAULT_START = datetime(2025, 10, 29, 20, 0)
+
+
+def make_train_data(train_count, seed=0, start=DEFAULT_START, spacing_seconds=60, type_mix=None, delay_share=0.0,
+                    entry_nodes=ENTRY_NODES, exit_nodes=EXIT_NODES):
+    """
+    Returns a `trains` dict with one arrival roughly every `spacing_seconds`.
+    type_mix maps train types to relative weights (uniform by default), and
+    delay_share of the trains get random delay_factors. The defaults draw
+    the same trains as before these options existed.
+    """
+    rng = random.Random(seed)
+    types, weights = zip(*type_mix.items()) if type_mix else (TRAIN_TYPES, None)
+    trains = {}
+    for i in range(train_count):
+        entry_time = start + timedelta(seconds=rng.randint(0, round(spacing_seconds * train_count)))
+        train_type = rng.choices(types, weights)[0] if weights else rng.choice(types)
+        train = trains[f'T{i:04d}_{train_type[:4]}'] = {
+            'type': train_type,
+            'entry_node': rng.choice(entry_nodes),
+            'exit_node': rng.choice(exit_nodes),
+            'scheduled_entry_time': entry_time.isoformat(),
+            'delay_factors': None,
+        }
+        if delay_share and rng.random() < delay_share:
+            train['delay_factors'] = {
+                'chain_pull_delay': rng.choice([0, 0, 1, 2.5]),
+                'loco_pilot_delay': round(rng.random() * 3, 2),
+                'ml_weather_delay': rng.choice([0, 0, 0, 4]),
+            }
+    return trains
+
+
+def make_closures(closure_count, seed=0, network_state=None):
+    """
+    `non_functional_segments` closing `closure_count` distinct segments of
+    the topology, never the entry and exit links, so every train keeps a
+    way in and out of the station (it may still be left without a path).
+    """
+    from or_module import NetworkTimeState
+    segments = sorted(segment for segment in (network_state or NetworkTimeState()).edge_travel_times
+                      if not any(node.startswith('Entry_') for node in segment))
+    return [list(segment) for segment in random.Random(seed).sample(segments, min(closure_count, len(segments)))]
+
+
+def make_payload(train_count, seed=0, arrivals_per_hour=60, type_mix=None, closure_count=0, delay_share=0.0,
+                 start=DEFAULT_START):
+    """
+    A complete /optimize body: `train_count` trains arriving at
+    `arrivals_per_hour` on average over the NetworkTimeState topology,
+    with `closure_count` closed segments.
+    """
+    return {
+        'name': f"{train_count} trains, {arrivals_per_hour}/h, {closure_count} closures, seed {seed}",
+        'trains': make_train_data(train_count, seed=seed, start=start, spacing_seconds=3600 / arrivals_per_hour,
+                                  type_mix=type_mix, delay_share=delay_share),
+        'non_functional_segments': make_closures(closure_count, seed=seed),
+    }
+
+
+def build_journeys(train_data, network_state, non_functional_segments=None):
+    """TrainJourney objects for a `trains` dict, sharing one path catalog."""
+    from or_module import TrainJourney, get_path_catalog
+    catalog = get_path_catalog(network_state, non_functional_segments)
+    return [TrainJourney(tid, info['entry_node'], info['exit_node'], datetime.fromisoformat(info['scheduled_entry_time']),
+                         info['type'], network_state, non_functional_segments=non_functional_segments,
+                         path_catalog=catalog)
+            for tid, info in train_data.items()]
+
+
+def make_topology(tracks, sections, seed=0):
+    """
+    A topology file's content for a large interlocking: `tracks` parallel
+    lines of `sections` segments each, with crossovers to the neighbouring
+    line every few sections and a platform on every line halfway along.
+    Trains enter at 'In_<track>' and leave at 'Out_<track>'. Returns
+    (topology, entry_nodes, exit_nodes).
+    """
+    rng = random.Random(seed)
+    node = 'T{}_S{}'.format
+    platform_section = sections // 2
+    edges, platforms = [], {}
+    for track in range(tracks):
+        edges.append([f'In_{track}', node(track, 0), 2])
+        edges.append([node(track, sections), f'Out_{track}', 2])
+        for section in range(sections):
+            if section == platform_section:
+                platforms[f'Platform {track + 1}'] = [node(track, section), node(track, section + 1)]
+                edges.append([node(track, section), node(track, section + 1), 5])
+            else:
+                edges.append([node(track, section), node(track, section + 1), rng.choice([1, 1.5, 2])])
+            if section % 3 == 0 and track + 1 < tracks:
+                edges.append([node(track, section), node(track + 1, section + 1), 2])
+            if section % 3 == 1 and track > 0:
+                edges.append([node(track, section), node(track - 1, section + 1), 2])
+    topology = {
+        'name': f"Interlocking, {tracks} tracks x {sections} sections",
+        'edges': edges,
+        'dwell_times': {'Passenger': 3, 'Special': 2, 'Freight': 8, 'Local': 5},
+        'platforms': platforms,
+    }
+    return topology, [f'In_{track}' for track in range(tracks)], [f'Out_{track}' for track in range(tracks)]
@@ -0,0 +1,25 @@
+"""
+Writes the path table of a topology file (TOPOLOGY_FILE by default) next
+to it as <name>.paths.json: the PATH_TABLE_DEPTH shortest paths of every
+entry/exit pair, which the OR module reads instead of running networkx at
+request time. Run it after editing the topology; until then the OR module
+computes paths with networkx on first use of each pair.
+
+    python build_path_table.py [topology.json]
+"""
+import json
+import sys
+import time
+
+from or_module import NetworkTimeState, build_path_table, path_table_file
+
+if __name__ == '__main__':
+    network_state = NetworkTimeState(sys.argv[1] if len(sys.argv) > 1 else None)
+    started = time.perf_counter()
+    table = build_path_table(network_state)
+    output_file = path_table_file(network_state.topology_file)
+    with open(output_file, 'w') as f:
+        json.dump(table, f, separators=(',', ':'))
+        f.write('\n')
+    print(f"Wrote {sum(len(paths) for _, _, paths in table['paths'])} paths for {len(table['paths'])} "
+          f"entry/exit pairs to {output_file} in {time.perf_counter() - started:.1f} s")
@@ -1,168 +1,329 @@
 import json
 import os
-import redis
+import threading
+import time
+from bisect import bisect_right
 from datetime import datetime, timedelta
 import uuid
-from dotenv import load_dotenv
+from or_module import NetworkTimeState
 
 # --- New: Redis Configuration ---
-# Load environment variables from a .env file for local development
-load_dotenv()
+# The client is created on first use rather than at import, so a cold start
+# does not pay for the redis import or a connection before a request needs
+# one, and modules importing this one load without REDIS_URL.
+_redis_client = None
+_redis_client_lock = threading.Lock()
 
-# Get the Redis connection URL from environment variables.
-# This works both locally (reads from .env) and on Vercel (reads from project settings).
-REDIS_URL = os.environ.get('REDIS_URL')
 
-# Raise an error if the URL isn't found, as the app can't function without it.
-if not REDIS_URL:
-    raise ValueError("FATAL ERROR: REDIS_URL environment variable is not set.")
+def get_redis_client():
+    """
+    Returns the process-wide Redis client, creating it on first use. Its
+    connection pool opens connections as commands need them and keeps them
+    for later requests while the process stays warm.
+    """
+    global _redis_client
+    if _redis_client is None:
+        with _redis_client_lock:
+            if _redis_client is None:
+                import redis
+
+                # Get the Redis connection URL from environment variables.
+                # This works both locally (main.py reads .env) and on Vercel (reads from project settings).
+                redis_url = os.environ.get('REDIS_URL')
+
+                # Raise an error if the URL isn't found, as the app can't function without it.
+                if not redis_url:
+                    raise ValueError("FATAL ERROR: REDIS_URL environment variable is not set.")
+
+                # Establish a connection to your Upstash Redis database.
+                _redis_client = redis.from_url(redis_url)
+    return _redis_client
+
+
+def set_redis_client(client):
+    """Replaces the process-wide client, e.g. with a fake in benchmarks."""
+    global _redis_client
+    _redis_client = client
 
-# Establish a connection to your Upstash Redis database.
-redis_client = redis.from_url(REDIS_URL)
 
-# Define the single key we will use to store the entire dashboard state in Redis.
+# Prefix of the dashboard keys in Redis. Each data class is stored as its own
+# compact JSON string under "dashboard_live_state:<class>", so an endpoint
+# only downloads the class it serves.
 REDIS_DASHBOARD_KEY = "dashboard_live_state"
 
+# Incremented with every state write, in the same transaction as the
+# classes themselves, together with the write's Unix time.
+REDIS_DASHBOARD_VERSION_KEY = f"{REDIS_DASHBOARD_KEY}:version"
+REDIS_DASHBOARD_UPDATED_AT_KEY = f"{REDIS_DASHBOARD_KEY}:updated_at"
+
+# How long a worker serves its cached classes before checking the version
+# key again. 0 checks on every request.
+DASHBOARD_CACHE_TTL_SECONDS = float(os.environ.get('DASHBOARD_CACHE_TTL_SECONDS', '1'))
+
+# Pub/sub channel announcing each state write with the classes it changed.
+REDIS_DASHBOARD_CHANNEL = f"{REDIS_DASHBOARD_KEY}:updates"
+
+# The data classes of the live state, in the order they are written.
+DASHBOARD_CLASSES = ('kpis', 'currentDelays', 'trainQueue', 'platformStatus', 'predictedConflicts',
+                     'trainTypeData', 'last_updated')
+
+# Audit entries are not a data class: each state write appends one per
+# train to this Redis Stream, so their history outlives the write. The
+# stream is capped at about AUDIT_STREAM_MAXLEN entries and entries older
+# than AUDIT_RETENTION_SECONDS are trimmed on every write; both trims are
+# approximate, so Redis may briefly keep a few more.
+REDIS_AUDIT_STREAM_KEY = "dashboard_audit_log"
+AUDIT_STREAM_MAXLEN = int(os.environ.get('AUDIT_STREAM_MAXLEN', '100000'))
+AUDIT_RETENTION_SECONDS = float(os.environ.get('AUDIT_RETENTION_SECONDS', str(7 * 24 * 3600)))
+
+# Entries per audit page by default and at most, and the most entries one
+# page request reads from the stream while filtering by train.
+AUDIT_PAGE_SIZE = 100
+AUDIT_MAX_PAGE_SIZE = 1000
+AUDIT_MAX_SCAN = 10000
+
+# Returned for a class that has not been written yet.
+EMPTY_DATA_CLASS_JSON = b"[]"
+
 
-def update_and_get_dashboard_state(optimization_results, initial_train_data):
+def dashboard_class_key(class_name):
+    return f"{REDIS_DASHBOARD_KEY}:{class_name}"
+
+
+def _state_message(version, updated_at, classes):
+    """
+    Compact JSON {"version", "updated_at", "classes": {name: value}} built
+    from already serialized class bytes, without re-serializing them.
+    """
+    members = b",".join(json.dumps(class_name).encode() + b":" + body for class_name, body in classes.items())
+    return b'{"version":%d,"updated_at":%s,"classes":{%s}}' % (version, json.dumps(updated_at).encode(), members)
+
+
+def _parse_version(version, updated_at):
+    return (int(version) if version is not None else None,
+            float(updated_at) if updated_at is not None else None)
+
+
+class DashboardReadCache:
+    """
+    Per-worker copy of the stored data classes, each entry a
+    (json_bytes, version, updated_at) tuple. The state only changes when
+    /optimize runs, so a request costs at most one GET of the version keys,
+    and none within `ttl_seconds` of the last check. A class is downloaded
+    again only once the version has moved past its cached copy.
+    """
+    def __init__(self, ttl_seconds=DASHBOARD_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.entries = {}
+        self.state = (None, None)  # (version, updated_at) last seen in Redis
+        self.checked_at = None
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, class_name):
+        now = time.monotonic()
+        if self.checked_at is None or now - self.checked_at >= self.ttl_seconds:
+            state = _parse_version(*get_redis_client().mget(REDIS_DASHBOARD_VERSION_KEY, REDIS_DASHBOARD_UPDATED_AT_KEY))
+            self._observe(state, now)
+        entry = self.entries.get(class_name)
+        if entry is not None and entry[1] == self.state[0]:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        body, version, updated_at = get_redis_client().mget(dashboard_class_key(class_name), REDIS_DASHBOARD_VERSION_KEY,
+                                                            REDIS_DASHBOARD_UPDATED_AT_KEY)
+        state = _parse_version(version, updated_at)
+        # If the key doesn't exist in Redis yet, it means the /optimize
+        # endpoint hasn't been called. Return an empty list as a safe default.
+        entry = (body if body is not None else EMPTY_DATA_CLASS_JSON,) + state
+        with self.lock:
+            self.entries[class_name] = entry
+        self._observe(state, now)
+        return entry
+
+    def store(self, classes, version, updated_at):
+        """Caches the classes this worker has just written as `version`."""
+        with self.lock:
+            for class_name, body in classes.items():
+                self.entries[class_name] = (body, version, updated_at)
+        self._observe((version, updated_at), time.monotonic())
+
+    def _observe(self, state, now):
+        with self.lock:
+            # A slower concurrent read must not move the version backwards.
+            if self.state[0] is None or (state[0] or 0) >= self.state[0]:
+                self.state = state
+            self.checked_at = now
+
+
+dashboard_read_cache = DashboardReadCache()
+
+
+# Timeline keys of the platform tracks, and the platforms in the topology's order.
+PLATFORM_SEGMENTS = {f"{u}->{v}": name for name, (u, v) in NetworkTimeState().platforms.items()}
+PLATFORMS = list(dict.fromkeys(PLATFORM_SEGMENTS.values()))
+
+
+class PlatformOccupancy:
+    """
+    Sweep-line index of platform occupancy intervals. Each platform's
+    intervals are sorted by start, with a running maximum of their ends, so
+    occupant() finds the interval covering a time by bisection; occupancy
+    of one track is exclusive, so it is the one starting last.
+    """
+    def __init__(self):
+        self.intervals = {platform: [] for platform in PLATFORMS}
+        self.total_seconds = {platform: 0 for platform in PLATFORMS}
+        self.starts = self.max_ends = None
+
+    @classmethod
+    def from_timelines(cls, timelines):
+        """Builds the index from execute_module timelines ({train: {"u->v": (start, end)}})."""
+        index = cls()
+        for train_id, segments in timelines.items():
+            for segment_key, (start, end) in segments.items():
+                platform = PLATFORM_SEGMENTS.get(segment_key)
+                if platform is not None:
+                    index.add(platform, start, end, train_id)
+        index.build()
+        return index
+
+    def add(self, platform, start, end, train_id):
+        if isinstance(start, str):
+            start, end = datetime.fromisoformat(start), datetime.fromisoformat(end)
+        self.intervals.setdefault(platform, []).append((start, end, train_id))
+        self.total_seconds[platform] = self.total_seconds.get(platform, 0) + (end - start).total_seconds()
+
+    def build(self):
+        self.starts, self.max_ends = {}, {}
+        for platform, intervals in self.intervals.items():
+            intervals.sort(key=lambda interval: interval[0])
+            self.starts[platform] = [start for start, _, _ in intervals]
+            max_ends, latest = [], None
+            for _, end, _ in intervals:
+                latest = end if latest is None or end > latest else latest
+                max_ends.append(latest)
+            self.max_ends[platform] = max_ends
+
+    def occupant(self, platform, when):
+        """Train occupying `platform` at `when`, or None."""
+        intervals, max_ends = self.intervals.get(platform, []), self.max_ends.get(platform, [])
+        i = bisect_right(self.starts.get(platform, []), when) - 1
+        # Walk back only while an earlier interval could still cover `when`.
+        while i >= 0 and max_ends[i] > when:
+            if intervals[i][1] > when:
+                return intervals[i][2]
+            i -= 1
+        return None
+
+    def span(self):
+        """(earliest start, latest end) over all platforms, or None without intervals."""
+        starts = [intervals[0][0] for intervals in self.intervals.values() if intervals]
+        if not starts:
+            return None
+        return min(starts), max(max_ends[-1] for max_ends in self.max_ends.values() if max_ends)
+
+
+def _scheduled_entry_time(train_id, initial_info, solution):
+    """The train's scheduled entry, as already parsed by the OR module when its solution is at hand."""
+    journey = solution.train_journeys.get(train_id) if solution is not None else None
+    if journey is not None:
+        return journey.scheduled_entry_time
+    entry_time = initial_info.get('scheduled_entry_time')
+    return datetime.fromisoformat(entry_time) if isinstance(entry_time, str) else entry_time
+
+
+def update_and_get_dashboard_state(optimization_results, initial_train_data, timer=None):
     """
     Takes the full output of the OR module, transforms it into all the required
     data classes for the dashboard, saves it to REDIS, and returns the live state.
+    timer, if given, times the transformation ('dashboard') and the write
+    ('redis') and records the size of the stored classes.
     """
-    # ==========================================================================
-    # All of your data processing logic below remains UNCHANGED.
-    # It correctly calculates the state. We only change how it's saved at the end.
-    # ==========================================================================
-    
+    started = time.perf_counter()
     recommendations = optimization_results.get('recommendations', [])
     conflicts = optimization_results.get('conflicts', [])
-    timelines_raw = optimization_results.get('timelines', {})
+    timelines = optimization_results.get('timelines', {})
+    solution = optimization_results.get('solution')
     now = datetime.now()
 
-    # ** CONVERT TIMELINES **
-    timelines = {}
-    for train_id, segments in timelines_raw.items():
-        timelines[train_id] = {}
-        for segment_key, (start_val, end_val) in segments.items():
-            if isinstance(start_val, str):
-                start_dt = datetime.fromisoformat(start_val)
-                end_dt = datetime.fromisoformat(end_val)
-            else:
-                start_dt, end_dt = start_val, end_val
-            timelines[train_id][segment_key] = (start_dt, end_dt)
-
-    # ** Sanitize the input data **
-    sanitized_initial_data = {}
-    for tid, info in initial_train_data.items():
-        sanitized_info = info.copy()
-        if isinstance(info.get('scheduled_entry_time'), str):
-            sanitized_info['scheduled_entry_time'] = datetime.fromisoformat(info['scheduled_entry_time'])
-        if isinstance(info.get('scheduled_exit_time'), str):
-            sanitized_info['scheduled_exit_time'] = datetime.fromisoformat(info['scheduled_exit_time'])
-        sanitized_initial_data[tid] = sanitized_info
-
-    # --- Data Class 1: currentDelays ---
-    current_delays = []
-    for rec in recommendations:
-        if rec['total_delay_minutes'] > 0:
-            initial_info = sanitized_initial_data.get(rec['train_id'], {})
-            if 'scheduled_entry_time' in initial_info:
-                eta = (initial_info['scheduled_entry_time'] + timedelta(minutes=rec['total_delay_minutes'])).strftime('%H:%M')
-                current_delays.append({
-                    'trainId': rec['train_id'],
-                    'trainType': initial_info.get('type'),
-                    'delay': rec['total_delay_minutes'],
-                    'section': f"Junction near {rec['path'][1] if rec['path'] and len(rec['path']) > 1 else 'Start'}",
-                    'eta': eta
-                })
+    # --- Data Class 3 & KPI: platformStatus and Occupancy Calculation ---
+    occupancy = PlatformOccupancy.from_timelines(timelines)
+    platform_status = []
+    for platform in PLATFORMS:
+        current_train = occupancy.occupant(platform, now)
+        platform_status.append({
+            'id': platform,
+            'status': 'occupied' if current_train is not None else 'available',
+            'train': current_train,
+            'totalOccupancyMinutes': round(occupancy.total_seconds[platform] / 60, 2)
+        })
+    span = occupancy.span()
+    total_station_operating_time = round((span[1] - span[0]).total_seconds() / 60, 2) if span else 0
 
-    # --- Data Class 2: trainQueue ---
-    train_queue = []
+    # --- Data Classes 1, 2, 5 and 6, in one pass over the recommendations ---
+    current_delays, train_queue, audit_entries = [], [], []
+    train_type_agg = {}
     status_map = {'PROCEED': 'Approaching', 'HOLD': 'Holding', 'REROUTED': 'Rerouted'}
     for rec in recommendations:
         tid = rec['train_id']
-        initial_info = sanitized_initial_data.get(tid, {})
-        if 'scheduled_entry_time' in initial_info:
-            eta_time = (initial_info['scheduled_entry_time'] + timedelta(minutes=rec.get('total_delay_minutes', 0)))
+        initial_info = initial_train_data.get(tid, {})
+        train_type = initial_info.get('type')
+        delay = rec['total_delay_minutes']
+        path = rec['path']
+        entry_time = _scheduled_entry_time(tid, initial_info, solution)
+
+        if entry_time is not None:
+            eta = (entry_time + timedelta(minutes=delay)).strftime('%H:%M')
+            # --- Data Class 1: currentDelays ---
+            if delay > 0:
+                current_delays.append({
+                    'trainId': tid,
+                    'trainType': train_type,
+                    'delay': delay,
+                    'section': f"Junction near {path[1] if path and len(path) > 1 else 'Start'}",
+                    'eta': eta
+                })
+            # --- Data Class 2: trainQueue ---
             train_queue.append({
                 'trainId': tid,
                 'priority': initial_info.get('type', 'Unknown'),
                 'status': status_map.get(rec['action'], 'Scheduled'),
                 'platform': f"Platform {tid[-1]}", # Simple logic
-                'eta': eta_time.strftime('%H:%M'),
+                'eta': eta,
                 'passengers': 850 if 'Pass' in initial_info.get('type', '') else 0
             })
-    
-    # --- Data Class 3 & KPI: platformStatus and Occupancy Calculation ---
-    platform_events = {1: [], 2: [], 3: []}
-    for train_id, timeline in timelines.items():
-        for segment_key, (start, end) in timeline.items():
-            if 'P1_entry' in segment_key and 'P1_exit' in segment_key:
-                platform_events[1].append({'start': start, 'end': end, 'train': train_id})
-            elif 'P2_entry' in segment_key and 'P2_exit' in segment_key:
-                platform_events[2].append({'start': start, 'end': end, 'train': train_id})
-            elif 'P3_entry' in segment_key and 'P3_exit' in segment_key:
-                platform_events[3].append({'start': start, 'end': end, 'train': train_id})
-    
-    platform_status, all_platform_times = [], []
-    for p_num in range(1, 4):
-        events = platform_events[p_num]
-        total_occupancy_seconds = sum((e['end'] - e['start']).total_seconds() for e in events)
-        status, current_train = 'available', None
-        for event in events:
-            if event['start'] <= now < event['end']:
-                status, current_train = 'occupied', event['train']
-                break
-        platform_status.append({
-            'id': f'Platform {p_num}', 
-            'status': status, 
-            'train': current_train, 
-            'totalOccupancyMinutes': round(total_occupancy_seconds / 60, 2)
-        })
-        if events: 
-            all_platform_times.extend([e['start'] for e in events] + [e['end'] for e in events])
-    
-    total_station_operating_time = round((max(all_platform_times) - min(all_platform_times)).total_seconds() / 60, 2) if all_platform_times else 0
-
-    # --- Data Class 4: predictedConflicts ---
-    predicted_conflicts = conflicts
 
-    # --- Data Class 5: trainTypeData ---
-    train_type_agg = {}
-    for rec in recommendations:
-        train_type = sanitized_initial_data.get(rec['train_id'], {}).get('type')
+        # --- Data Class 5: trainTypeData ---
         if train_type:
-            if train_type not in train_type_agg: 
-                train_type_agg[train_type] = {'delays': [], 'passed_count': 0}
-            train_type_agg[train_type]['delays'].append(rec['total_delay_minutes'])
-            if rec['action'] != 'HOLD': 
-                train_type_agg[train_type]['passed_count'] += 1
-    
-    train_type_summary = []
-    for t_type, data in train_type_agg.items():
-        avg_delay = sum(data['delays']) / len(data['delays']) if data['delays'] else 0
-        train_type_summary.append({
-            'type': t_type, 
-            'avgDelay': round(avg_delay, 2), 
-            'count': data['passed_count']
-        })
+            aggregate = train_type_agg.setdefault(train_type, {'delay_sum': 0, 'delay_count': 0, 'passed_count': 0})
+            aggregate['delay_sum'] += delay
+            aggregate['delay_count'] += 1
+            if rec['action'] != 'HOLD':
+                aggregate['passed_count'] += 1
 
-    # --- Data Class 6: auditData ---
-    audit_data = []
-    for rec in recommendations:
-        initial_info = sanitized_initial_data.get(rec['train_id'], {})
-        audit_data.append({
+        # --- Audit log entry ---
+        audit_entries.append({
             'id': f"AUD_{str(uuid.uuid4().hex)[:6].upper()}",
-            'trainId': rec['train_id'],
-            'section': f"Junction {rec['path'][1] if rec['path'] and len(rec['path']) > 1 else 'N/A'}",
-            'aiRecommendation': f"{rec['action']} via path: {'->'.join(rec['path'] or [])}",
-            'outcome': f"Success - Final Delay: {rec['total_delay_minutes']:.2f} min",
-            'conflictType': 'Priority Crossing' if rec['total_delay_minutes'] > 0 else 'Clear Path',
+            'trainId': tid,
+            'section': f"Junction {path[1] if path and len(path) > 1 else 'N/A'}",
+            'aiRecommendation': f"{rec['action']} via path: {'->'.join(path or [])}",
+            'outcome': f"Success - Final Delay: {delay:.2f} min",
+            'conflictType': 'Priority Crossing' if delay > 0 else 'Clear Path',
             'priority': initial_info.get('type', 'Unknown'),
             'weatherCondition': 'Clear', 
             'linkedIncident': None
         })
 
+    # --- Data Class 4: predictedConflicts ---
+    predicted_conflicts = conflicts
+
+    train_type_summary = [{
+        'type': t_type,
+        'avgDelay': round(data['delay_sum'] / data['delay_count'], 2),
+        'count': data['passed_count']
+    } for t_type, data in train_type_agg.items()]
+
     # --- Assemble the final state ---
     live_state = {
         'kpis': {'totalStationOperatingTimeMinutes': total_station_operating_time},
@@ -171,18 +332,46 @@ def update_and_get_dashboard_state(optimization_results, initial_train_data):
         'platformStatus': platform_status,
         'predictedConflicts': predicted_conflicts,
         'trainTypeData': train_type_summary,
-        'auditData': audit_data,
         'last_updated': datetime.now()
     }
     
-    # --- Changed: Save to Redis instead of a local file ---
+    # --- Save each data class to Redis under its own key ---
     try:
-        # Convert the dictionary to a JSON string. `default=str` is crucial
-        # to handle datetime objects that are not natively JSON serializable.
-        state_as_json_string = json.dumps(live_state, indent=2, default=str)
-        
-        # Store the JSON string in Redis under our predefined key.
-        redis_client.set(REDIS_DASHBOARD_KEY, state_as_json_string)
+        # Serialize each class once here, compactly, so readers can serve the
+        # stored bytes as they are. `default=str` is crucial to handle
+        # datetime objects that are not natively JSON serializable.
+        classes = {class_name: json.dumps(value, separators=(',', ':'), default=str).encode()
+                   for class_name, value in live_state.items()}
+        audit_bodies = [json.dumps(entry, separators=(',', ':'), default=str).encode() for entry in audit_entries]
+        if timer is not None:
+            write_started = time.perf_counter()
+            timer.add('dashboard', write_started - started)
+            timer.size('dashboard_state', sum(len(body) for body in classes.values()))
+            timer.size('audit_entries', sum(len(body) for body in audit_bodies))
+        updated_at = time.time()
+        pipe = get_redis_client().pipeline(transaction=True)
+        for class_name, body in classes.items():
+            # SET ... GET returns the previous value, for the update diff.
+            pipe.set(dashboard_class_key(class_name), body, get=True)
+        pipe.incr(REDIS_DASHBOARD_VERSION_KEY)
+        pipe.set(REDIS_DASHBOARD_UPDATED_AT_KEY, repr(updated_at))
+        # Drop the single-blob state and the audit class written by earlier versions.
+        pipe.delete(REDIS_DASHBOARD_KEY, dashboard_class_key('auditData'))
+        for entry, body in zip(audit_entries, audit_bodies):
+            pipe.xadd(REDIS_AUDIT_STREAM_KEY, {'trainId': entry['trainId'], 'entry': body},
+                      maxlen=AUDIT_STREAM_MAXLEN, approximate=True)
+        pipe.xtrim(REDIS_AUDIT_STREAM_KEY, minid=int((updated_at - AUDIT_RETENTION_SECONDS) * 1000), approximate=True)
+        replies = pipe.execute()
+        version = replies[len(classes)]
+        dashboard_read_cache.store(classes, version, updated_at)
+
+        # Announce only the classes whose serialized value changed to
+        # /dashboard/stream subscribers.
+        changed = {class_name: body for (class_name, body), previous in zip(classes.items(), replies)
+                   if body != previous}
+        get_redis_client().publish(REDIS_DASHBOARD_CHANNEL, _state_message(version, updated_at, changed))
+        if timer is not None:
+            timer.add('redis', time.perf_counter() - write_started)
         
         print(f"Live dashboard state has been updated in Redis.")
 
@@ -194,29 +383,117 @@ def update_and_get_dashboard_state(optimization_results, initial_train_data):
     return live_state
 
 
-def get_dashboard_data_class(class_name):
+def get_dashboard_data_class_json(class_name):
     """
-    Fetches the entire dashboard state from Redis, then returns the specific
-    data class (e.g., 'platformStatus') that was requested.
+    Returns (json_bytes, version, updated_at) for one data class exactly as
+    stored in Redis, without parsing it, through the worker's read cache.
+    version and updated_at (Unix time of the write) are None before the
+    first /optimize call.
     """
     try:
-        # --- Changed: Read from Redis instead of a local file ---
-        # Retrieve the JSON string from our key in Redis
-        state_as_json_string = redis_client.get(REDIS_DASHBOARD_KEY)
+        return dashboard_read_cache.get(class_name)
+    except Exception as e:
+        print(f"ERROR: Could not retrieve state from Redis. Reason: {e}")
+        # Serve the last copy this worker saw, or an empty list to prevent
+        # the frontend from crashing on an error.
+        return dashboard_read_cache.entries.get(class_name) or (EMPTY_DATA_CLASS_JSON, None, None)
 
-        # If the key doesn't exist in Redis yet, it means the /optimize
-        # endpoint hasn't been called. Return an empty list as a safe default.
-        if state_as_json_string is None:
-            return []
-        
-        # If data was found, parse the JSON string back into a Python dictionary
-        data = json.loads(state_as_json_string)
-        
-        # Return the specific list/value for the requested class_name.
-        # .get() is used to safely return an empty list if the key isn't in the data.
-        return data.get(class_name, [])
 
+def _with_recorded_at(body, stream_id):
+    """Adds `recordedAt`, the local time of the stream ID, to an entry's JSON object bytes."""
+    recorded_at = datetime.fromtimestamp(int(stream_id.partition('-')[0]) / 1000).isoformat(timespec='milliseconds')
+    return b'%s,"recordedAt":"%s"}' % (body[:-1], recorded_at.encode())
+
+
+def get_audit_page(limit=AUDIT_PAGE_SIZE, cursor=None, train_id=None, since=None, until=None):
+    """
+    Returns (json_bytes, next_cursor): a JSON list of up to `limit` audit
+    entries, newest first, optionally only those of `train_id` and those
+    appended between the Unix times `since` and `until` (inclusive, to the
+    millisecond). Each entry's `recordedAt` is its append time, from the
+    stream ID. Pass next_cursor back as `cursor` for the following page;
+    it is None once the stream is exhausted. A filtered page stops after
+    AUDIT_MAX_SCAN entries, so it may hold fewer than `limit` entries while
+    next_cursor is still set.
+    """
+    newest = f"({cursor}" if cursor else (str(int(until * 1000)) if until is not None else '+')
+    oldest = str(int(since * 1000)) if since is not None else '-'
+    bodies, scanned = [], 0
+    try:
+        while True:
+            wanted = limit - len(bodies)
+            # A train filter skips entries, so read in larger batches.
+            batch_size = min(max(wanted, AUDIT_PAGE_SIZE) if train_id is not None else wanted, AUDIT_MAX_SCAN - scanned)
+            batch = get_redis_client().xrevrange(REDIS_AUDIT_STREAM_KEY, newest, oldest, count=batch_size)
+            for stream_id, fields in batch:
+                scanned += 1
+                cursor = stream_id.decode()
+                if train_id is None or fields[b'trainId'].decode() == train_id:
+                    bodies.append(_with_recorded_at(fields[b'entry'], cursor))
+                    if len(bodies) == limit:
+                        break
+            else:
+                if len(batch) < batch_size:
+                    cursor = None  # nothing older in range
+                    break
+            if len(bodies) == limit or scanned >= AUDIT_MAX_SCAN:
+                break
+            newest = f"({cursor}"
     except Exception as e:
-        print(f"ERROR: Could not retrieve or parse state from Redis. Reason: {e}")
-        # Return an empty list to prevent the frontend from crashing on an error.
+        print(f"ERROR: Could not retrieve audit entries from Redis. Reason: {e}")
+        return EMPTY_DATA_CLASS_JSON, None
+    return b"[" + b",".join(bodies) + b"]", cursor
+
+
+def get_dashboard_snapshot():
+    """
+    Returns (version, message) with every data class in the update message
+    format, read in one round trip; (None, None) before the first
+    /optimize call.
+    """
+    values = get_redis_client().mget([dashboard_class_key(class_name) for class_name in DASHBOARD_CLASSES] +
+                                     [REDIS_DASHBOARD_VERSION_KEY, REDIS_DASHBOARD_UPDATED_AT_KEY])
+    version, updated_at = _parse_version(*values[-2:])
+    if version is None:
+        return None, None
+    classes = {class_name: body for class_name, body in zip(DASHBOARD_CLASSES, values) if body is not None}
+    return version, _state_message(version, updated_at, classes)
+
+
+class DashboardUpdates:
+    """
+    Subscription to the update messages published by each state write, each
+    holding only the classes that write changed. Messages are not replayed:
+    a subscriber that misses a version must start again from
+    get_dashboard_snapshot(). Call close() when done.
+    """
+    def __init__(self):
+        self.pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(REDIS_DASHBOARD_CHANNEL)
+
+    def next_message(self, timeout):
+        """Waits up to `timeout` seconds; returns the message bytes or None."""
+        deadline = time.monotonic() + timeout
+        while True:
+            # Subscription confirmations come back as None before the timeout.
+            message = self.pubsub.get_message(timeout=max(deadline - time.monotonic(), 0))
+            if message is not None:
+                return message['data']
+            if time.monotonic() >= deadline:
+                return None
+
+    def close(self):
+        self.pubsub.close()
+
+
+def get_dashboard_data_class(class_name):
+    """
+    Fetches and parses the requested data class (e.g., 'platformStatus')
+    from Redis.
+    """
+    state_as_json_bytes, _, _ = get_dashboard_data_class_json(class_name)
+    try:
+        return json.loads(state_as_json_bytes)
+    except ValueError as e:
+        print(f"ERROR: Could not parse state from Redis. Reason: {e}")
         return []
@@ -1,64 +1,400 @@
-from flask import Flask, request, jsonify
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+# Load environment variables from a .env file for local development, before
+# the modules below read their settings. Vercel sets them on the project, so
+# the import is skipped there to keep cold starts short.
+if not os.getenv("VERCEL"):
+    from dotenv import load_dotenv
+    load_dotenv()
+
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS  # <- Import CORS
-from or_module import execute_module
-from dashboard_data_manager import update_and_get_dashboard_state, get_dashboard_data_class
+from or_module import SEARCH_MODES, NetworkTimeState, evaluate_closure_scenarios
+from result_cache import cached_execute_module, request_cache_key, result_cache
+from optimization_jobs import OptimizationJobs, JobQueueFull, get_job
+from solution_store import load_last_solution, save_last_solution
+from metrics import METRICS_ENABLED, StageTimer, registry, request_duration, request_size, response_size
+from dashboard_data_manager import (update_and_get_dashboard_state, get_dashboard_data_class_json,
+                                    get_dashboard_snapshot, get_audit_page, DashboardUpdates,
+                                    AUDIT_PAGE_SIZE, AUDIT_MAX_PAGE_SIZE)
  
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
+# Upper bound on the annealing chains (and worker processes) one request may ask for.
+MAX_RESTARTS = 32
+
+# Wall-clock cap on one /optimize search, kept under the hosting platform's
+# function timeout. A request's `time_budget_ms` is clamped to it.
+OPTIMIZE_TIME_LIMIT_MS = int(os.getenv("OPTIMIZE_TIME_LIMIT_MS", "8000"))
+
+# Wall-clock cap on one /optimize/jobs search. Jobs run outside the request,
+# so they are not bound by the function timeout.
+OPTIMIZE_JOB_TIME_LIMIT_MS = int(os.getenv("OPTIMIZE_JOB_TIME_LIMIT_MS", "60000"))
+
+# /dashboard/stream sends a comment line at this interval so proxies keep the
+# connection open, and ends the stream after DASHBOARD_STREAM_MAX_SECONDS to
+# stay under the function timeout; EventSource clients then reconnect.
+DASHBOARD_STREAM_HEARTBEAT_SECONDS = 15
+DASHBOARD_STREAM_MAX_SECONDS = float(os.getenv("DASHBOARD_STREAM_MAX_SECONDS", "25"))
+DASHBOARD_STREAM_RETRY_MS = 1000
+
+# Suggested wait before resubmitting when the job queue is full.
+JOB_RETRY_AFTER_SECONDS = 5
+
+# Upper bound on the closure scenarios one /optimize/batch request may compare.
+MAX_BATCH_SCENARIOS = 64
+
+# /optimize fields that /optimize/batch rejects: every scenario runs the same
+# seeded single-chain search within OPTIMIZE_TIME_LIMIT_MS.
+BATCH_UNSUPPORTED_FIELDS = ('restarts', 'mode', 'horizon_minutes', 'time_budget_ms')
+
+
+def _search_options(body, time_limit_ms=OPTIMIZE_TIME_LIMIT_MS):
+    """
+    Reads the optional multi-start fields of an /optimize body: `restarts`
+    and `workers` (1..MAX_RESTARTS), `seed` (any integer),
+    `time_budget_ms` (positive, clamped to `time_limit_ms`),
+    `horizon_minutes` (positive) and `mode` (one of SEARCH_MODES).
+    Raises ValueError if any of them is malformed.
+    """
+    options = {'time_limit_ms': time_limit_ms}
+    mode = body.get('mode')
+    if mode is not None:
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"'mode' must be one of {', '.join(SEARCH_MODES)}")
+        options['mode'] = mode
+    for key, minimum, maximum in (('restarts', 1, MAX_RESTARTS), ('workers', 1, MAX_RESTARTS), ('seed', None, None),
+                                 ('time_budget_ms', 1, None), ('horizon_minutes', 1, None)):
+        value = body.get(key)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError(f"'{key}' must be an integer")
+        if minimum is not None and value < minimum:
+            raise ValueError(f"'{key}' must be at least {minimum}" if maximum is None
+                             else f"'{key}' must be between {minimum} and {maximum}")
+        if maximum is not None and value > maximum:
+            raise ValueError(f"'{key}' must be between {minimum} and {maximum}")
+        options[key] = value
+    if 'time_budget_ms' in options:
+        options['time_budget_ms'] = min(options['time_budget_ms'], time_limit_ms)
+    return options
+
+def _warm_start_requested(body):
+    """
+    `warm_start` defaults to on for unseeded requests; seeded ones stay
+    reproducible unless they ask for it. Raises ValueError if not a boolean.
+    """
+    value = body.get('warm_start')
+    if value is None:
+        return body.get('seed') is None
+    if not isinstance(value, bool):
+        raise ValueError("'warm_start' must be a boolean")
+    return value
+
 # ==============================================================================
 # 1. Main Optimizer Endpoint
 # ==============================================================================
+def _optimization_request(body, time_limit_ms=OPTIMIZE_TIME_LIMIT_MS):
+    """
+    Validates an /optimize body into (trains, non_functional_segments,
+    search_options, warm_start), the search capped at `time_limit_ms`.
+    Raises ValueError if it is malformed.
+    """
+    if not body or 'trains' not in body:
+        raise ValueError("Invalid input")
+    return (body['trains'], body.get('non_functional_segments', []), _search_options(body, time_limit_ms),
+            _warm_start_requested(body))
+
+def _run_optimization(trains, non_functional_segments, search_options, warm_start, progress=None, timer=None):
+    # Run the core optimization logic, unless an identical request was answered recently
+    previous_decisions = load_last_solution() if warm_start else None
+    results, cache_layer = cached_execute_module(trains, non_functional_segments, progress=progress, timer=timer,
+                                                 warm_start=previous_decisions, **search_options)
+    if timer is not None and cache_layer is None:
+        timer.count('evaluated', results['search']['iterations'])
+        timer.count('accepted', results['search']['accepted'])
+    save_last_solution(results['recommendations'])
+    
+    # Update the live state in Firestore with the results
+    update_and_get_dashboard_state(results, trains, timer=timer)
+    
+    results.pop('solution', None) # The UI doesn't need the complex solution object
+    results['cache'] = {'status': 'hit' if cache_layer else 'miss', 'layer': cache_layer}
+    return results
+
+optimization_jobs = OptimizationJobs(_run_optimization)
+
 @app.route('/optimize', methods=['POST'])
 def optimize_schedule():
     """
     Receives train data, runs the optimization, updates the live dashboard state,
     and returns the schedule recommendations.
     """
-    train_data = request.get_json()
-    if not train_data or 'trains' not in train_data:
-        return jsonify({"error": "Invalid input"}), 400
-
-    non_functional_segments = train_data.get('non_functional_segments', [])
-    
-    # Run the core optimization logic
-    results = execute_module(train_data['trains'], non_functional_segments)
-    
-    # Update the live state in Firestore with the results
-    update_and_get_dashboard_state(results, train_data['trains'])
+    try:
+        optimization_request = _optimization_request(request.get_json())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     # Return the optimization results to the caller
-    results.pop('solution', None) # The UI doesn't need the complex solution object
-    return jsonify(results)
+    return jsonify(_run_optimization(*optimization_request, timer=g.get('timer')))
+
+@app.route('/optimize/jobs', methods=['POST'])
+def submit_optimization_job():
+    """
+    Queues the same work as /optimize, capped at OPTIMIZE_JOB_TIME_LIMIT_MS,
+    for the `python optimization_jobs.py` workers and returns 202 with the
+    job id at once. Identical requests share one job; 429 when the queue
+    is full.
+    """
+    try:
+        optimization_request = _optimization_request(request.get_json(), OPTIMIZE_JOB_TIME_LIMIT_MS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    trains, non_functional_segments, search_options, _ = optimization_request
+    job_id = request_cache_key(trains, non_functional_segments, search_options)
+    try:
+        created = optimization_jobs.submit(job_id, optimization_request)
+    except JobQueueFull as e:
+        response = jsonify({"error": str(e)})
+        response.headers['Retry-After'] = str(JOB_RETRY_AFTER_SECONDS)
+        return response, 429
+    response = jsonify({'job_id': job_id, 'coalesced': not created, 'status_url': f"/optimize/jobs/{job_id}"})
+    response.headers['Location'] = f"/optimize/jobs/{job_id}"
+    return response, 202
+
+@app.route('/optimize/jobs/<job_id>', methods=['GET'])
+def get_optimization_job(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job)
+
+def _batch_scenarios(body):
+    """
+    Reads `scenarios` of an /optimize/batch body: a list whose items are
+    either a segment list or {"name", "non_functional_segments"}, or
+    "each_segment" for one scenario per closed segment of the network.
+    Returns [(name, segments)]; raises ValueError if malformed.
+    """
+    scenarios = body.get('scenarios')
+    if scenarios == 'each_segment':
+        segments = list(NetworkTimeState().edge_travel_times)
+        if len(segments) > MAX_BATCH_SCENARIOS:
+            raise ValueError(f"'each_segment' gives {len(segments)} scenarios on this network; "
+                             f"at most {MAX_BATCH_SCENARIOS} are allowed")
+        return [(f"{u}->{v}", [[u, v]]) for u, v in segments]
+    if not isinstance(scenarios, list) or not scenarios:
+        raise ValueError("'scenarios' must be a non-empty list or \"each_segment\"")
+    if len(scenarios) > MAX_BATCH_SCENARIOS:
+        raise ValueError(f"'scenarios' may hold at most {MAX_BATCH_SCENARIOS} entries")
+    parsed = []
+    for n, scenario in enumerate(scenarios):
+        name, segments = f"scenario_{n}", scenario
+        if isinstance(scenario, dict):
+            name, segments = scenario.get('name', name), scenario.get('non_functional_segments')
+        if not isinstance(segments, list) or not all(isinstance(seg, list) and len(seg) == 2 for seg in segments):
+            raise ValueError(f"Scenario {n} must be a list of [from, to] segments")
+        parsed.append((str(name), segments))
+    return parsed
+
+@app.route('/optimize/batch', methods=['POST'])
+def optimize_batch():
+    """
+    What-if comparison of closure scenarios for one train set, ranked by
+    score. Runs across processes and leaves the live dashboard state,
+    result cache and warm-start solution untouched.
+    """
+    body = request.get_json()
+    if not body or 'trains' not in body:
+        return jsonify({"error": "Invalid input"}), 400
+    unsupported = [key for key in BATCH_UNSUPPORTED_FIELDS if key in body]
+    if unsupported:
+        return jsonify({"error": f"/optimize/batch does not accept {', '.join(unsupported)}"}), 400
+    try:
+        scenarios = _batch_scenarios(body)
+        search_options = _search_options(body)
+        baseline, results = evaluate_closure_scenarios(body['trains'], scenarios, seed=search_options.get('seed', 0),
+                                                       workers=search_options.get('workers'),
+                                                       time_limit_ms=search_options['time_limit_ms'])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({'baseline': baseline, 'scenarios': results})
+
+@app.route('/optimize/cache_stats', methods=['GET'])
+def get_result_cache_stats():
+    """Hit/miss counters of the /optimize result cache, for this worker and all workers."""
+    return jsonify(result_cache.snapshot())
 
 # ==============================================================================
 # 2. Dashboard GET Endpoints
 # ==============================================================================
 # These endpoints allow the UI to fetch the specific data "classes" it needs.
+# Each class is stored pre-serialized, so its bytes are returned as they are.
+
+def _dashboard_response(class_name):
+    body, version, updated_at = get_dashboard_data_class_json(class_name)
+    response = Response(body, mimetype='application/json')
+    # Clients may keep the body but must revalidate it on every poll.
+    response.headers['Cache-Control'] = 'no-cache'
+    if version is not None:
+        response.headers['X-Dashboard-Version'] = str(version)
+        response.set_etag(f"v{version}")
+        response.last_modified = datetime.fromtimestamp(updated_at, timezone.utc)
+    return response.make_conditional(request)
 
 @app.route('/dashboard/current_delays', methods=['GET'])
 def get_current_delays():
-    return jsonify(get_dashboard_data_class('currentDelays'))
+    return _dashboard_response('currentDelays')
 
 @app.route('/dashboard/train_queue', methods=['GET'])
 def get_train_queue():
-    return jsonify(get_dashboard_data_class('trainQueue'))
+    return _dashboard_response('trainQueue')
 
 @app.route('/dashboard/platform_status', methods=['GET'])
 def get_platform_status():
-    return jsonify(get_dashboard_data_class('platformStatus'))
+    return _dashboard_response('platformStatus')
 
 @app.route('/dashboard/predicted_conflicts', methods=['GET'])
 def get_predicted_conflicts():
-    return jsonify(get_dashboard_data_class('predictedConflicts'))
+    return _dashboard_response('predictedConflicts')
 
 @app.route('/dashboard/train_type_data', methods=['GET'])
 def get_train_type_data():
-    return jsonify(get_dashboard_data_class('trainTypeData'))
+    return _dashboard_response('trainTypeData')
     
+def _audit_query(args):
+    """
+    Reads the /dashboard/audit_data query string into get_audit_page
+    arguments: `limit` (1..AUDIT_MAX_PAGE_SIZE), `cursor` (a previous
+    X-Next-Cursor), `train_id`, and `since`/`until` (ISO 8601 times).
+    Raises ValueError if any of them is malformed.
+    """
+    query = {'limit': AUDIT_PAGE_SIZE, 'train_id': args.get('train_id') or None}
+    limit = args.get('limit')
+    if limit is not None:
+        if not limit.isdigit() or not 1 <= int(limit) <= AUDIT_MAX_PAGE_SIZE:
+            raise ValueError(f"'limit' must be between 1 and {AUDIT_MAX_PAGE_SIZE}")
+        query['limit'] = int(limit)
+    cursor = args.get('cursor')
+    if cursor:
+        milliseconds, _, sequence = cursor.partition('-')
+        if not (milliseconds.isdigit() and sequence.isdigit()):
+            raise ValueError("'cursor' must be a value of a previous X-Next-Cursor header")
+        query['cursor'] = cursor
+    for key in ('since', 'until'):
+        value = args.get(key)
+        if value:
+            try:
+                query[key] = datetime.fromisoformat(value).timestamp()
+            except ValueError:
+                raise ValueError(f"'{key}' must be an ISO 8601 time")
+    return query
+
 @app.route('/dashboard/audit_data', methods=['GET'])
 def get_audit_data():
-    return jsonify(get_dashboard_data_class('auditData'))
+    """
+    One page of the audit log, newest first. The X-Next-Cursor header,
+    when present, is the `cursor` of the next page.
+    """
+    try:
+        query = _audit_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    body, next_cursor = get_audit_page(**query)
+    response = Response(body, mimetype='application/json')
+    response.headers['Cache-Control'] = 'no-cache'
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+def _sse_event(event, version, data):
+    return b"event: %s\nid: %d\ndata: %s\n\n" % (event.encode(), version, data)
+
+def _dashboard_events(updates, last_version):
+    """
+    Yields a `snapshot` event with every class unless the client already
+    holds the current version, then one `update` event per state write
+    with only the changed classes. A client that missed a version gets a
+    fresh snapshot instead, since update events are diffs.
+    """
+    deadline = time.monotonic() + DASHBOARD_STREAM_MAX_SECONDS
+    try:
+        yield b"retry: %d\n\n" % DASHBOARD_STREAM_RETRY_MS
+        version, snapshot = get_dashboard_snapshot()
+        if version is not None and version != last_version:
+            yield _sse_event('snapshot', version, snapshot)
+            last_version = version
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            message = updates.next_message(min(DASHBOARD_STREAM_HEARTBEAT_SECONDS, remaining))
+            if message is None:
+                yield b": keepalive\n\n"
+                continue
+            version = json.loads(message)['version']
+            if last_version is not None and version <= last_version:
+                continue  # already covered by the snapshot
+            if last_version is None or version == last_version + 1:
+                yield _sse_event('update', version, message)
+            else:
+                version, snapshot = get_dashboard_snapshot()
+                yield _sse_event('snapshot', version, snapshot)
+            last_version = version
+    finally:
+        updates.close()
+
+@app.route('/dashboard/stream', methods=['GET'])
+def stream_dashboard():
+    """
+    Server-sent events replacing the polling of the /dashboard/* endpoints.
+    A reconnecting EventSource sends the last version it saw as
+    Last-Event-ID, so it only receives the updates after it.
+    """
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    last_version = int(last_event_id) if last_event_id.isdigit() else None
+    # Subscribe before the snapshot is read so no write falls in between.
+    updates = DashboardUpdates()
+    return Response(_dashboard_events(updates, last_version), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# ==============================================================================
+# 3. Instrumentation
+# ==============================================================================
+# Every response carries a Server-Timing header with the stages it went
+# through; /metrics exposes this worker's histograms to Prometheus.
+
+@app.before_request
+def _start_timer():
+    if METRICS_ENABLED:
+        g.timer = StageTimer()
+
+@app.after_request
+def _record_timing(response):
+    timer = g.get('timer')
+    if timer is None:
+        return response
+    elapsed = timer.elapsed()
+    response.headers['Server-Timing'] = timer.server_timing(elapsed)
+    endpoint = request.endpoint or 'unmatched'
+    request_duration.observe((endpoint,), elapsed)
+    if request.content_length:
+        request_size.observe((endpoint,), request.content_length)
+    if not response.is_streamed:
+        response_size.observe((endpoint,), response.content_length or 0)
+    timer.record()
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     # This allows you to run the server locally for testing
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Stage timers, Server-Timing headers and /metrics. With METRICS_ENABLED=0
+# no timer is created and nothing is recorded.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+
+# Upper bounds of the histogram buckets; +Inf is implied.
+LATENCY_BUCKETS_SECONDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_labels(names, values):
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values = {}  # label values -> total
+        self.lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for label_values, total in sorted(self.values.items()):
+                lines.append(f"{self.name}{{{_format_labels(self.label_names, label_values)}}} {total}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for label_values, series in sorted(self.series.items()):
+                labels = _format_labels(self.label_names, label_values)
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), series):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{self.name}_sum{{{labels}}} {series[-1]:.6g}")
+                lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics of this worker process, rendered in the Prometheus text format."""
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help_text, label_names):
+        return self._register(Counter(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names, buckets):
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = MetricsRegistry()
+request_duration = registry.histogram('http_request_duration_seconds', "Time to build each response, by endpoint.",
+                                      ('endpoint',), LATENCY_BUCKETS_SECONDS)
+request_size = registry.histogram('http_request_size_bytes', "Request body size, by endpoint.",
+                                  ('endpoint',), SIZE_BUCKETS_BYTES)
+response_size = registry.histogram('http_response_size_bytes', "Response body size, by endpoint; streams excluded.",
+                                   ('endpoint',), SIZE_BUCKETS_BYTES)
+stage_duration = registry.histogram('optimize_stage_duration_seconds', "Time spent in each stage of /optimize.",
+                                    ('stage',), LATENCY_BUCKETS_SECONDS)
+payload_size = registry.histogram('optimize_payload_size_bytes', "Size of the data written by /optimize, by payload.",
+                                  ('payload',), SIZE_BUCKETS_BYTES)
+moves = registry.counter('optimize_moves_total', "Annealing moves evaluated and accepted by /optimize searches.",
+                         ('outcome',))
+
+
+class StageTimer:
+    """
+    Wall-clock seconds of the named stages of one request, plus move counts
+    and payload sizes, recorded into the registry once the request is done.
+    A stage entered more than once accumulates.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counts = {}
+        self.sizes = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name, amount):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def size(self, name, nbytes):
+        self.sizes[name] = nbytes
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total_seconds):
+        """Server-Timing header value: each stage, then `total`, in milliseconds."""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        entries.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(entries)
+
+    def record(self):
+        for name, seconds in self.stages.items():
+            stage_duration.observe((name,), seconds)
+        for name, amount in self.counts.items():
+            moves.inc((name,), amount)
+        for name, nbytes in self.sizes.items():
+            payload_size.observe((name,), nbytes)
@@ -0,0 +1,230 @@
+import json
+import os
+import threading
+import time
+
+from dashboard_data_manager import get_redis_client
+from result_cache import decode_result, encode_result
+
+# New jobs are accepted while fewer than OPTIMIZE_JOB_QUEUE_LIMIT wait in the queue.
+OPTIMIZE_JOB_QUEUE_LIMIT = int(os.environ.get('OPTIMIZE_JOB_QUEUE_LIMIT', '8'))
+
+# How long a job's status and result are kept after its last update.
+OPTIMIZE_JOB_TTL_SECONDS = int(os.environ.get('OPTIMIZE_JOB_TTL_SECONDS', '3600'))
+
+# Progress is written to Redis at most this often while a job runs.
+PROGRESS_WRITE_INTERVAL_SECONDS = 0.5
+
+# A worker refreshes `heartbeat_at` of its running job at this interval. A
+# running job whose heartbeat is older than OPTIMIZE_JOB_STALE_SECONDS, or a
+# queued one that old and no longer in the queue, belongs to a worker that
+# stopped, and is started again by the next identical submission.
+JOB_HEARTBEAT_INTERVAL_SECONDS = 5
+OPTIMIZE_JOB_STALE_SECONDS = int(os.environ.get('OPTIMIZE_JOB_STALE_SECONDS', '30'))
+
+# One hash per job: status, progress, timestamps, the encoded request while
+# it waits or runs, and the result or error. Queued job ids wait in a list,
+# pushed on the left and popped on the right by the workers.
+REDIS_JOB_KEY_PREFIX = "optimize_job"
+REDIS_JOB_QUEUE_KEY = "optimize_job_queue"
+
+
+class JobQueueFull(Exception):
+    """Raised by OptimizationJobs.submit when the queue has no room for another job."""
+
+
+def job_key(job_id):
+    return f"{REDIS_JOB_KEY_PREFIX}:{job_id}"
+
+
+class OptimizationJobs:
+    """
+    Queues submitted jobs in Redis for `run(*args, progress=callback)`,
+    keeping each job's state there so any web worker can report it. Jobs
+    are identified by the caller's request key, so a duplicate submission
+    joins the queued, running or finished job instead of starting another;
+    only a failed job, or one whose worker stopped sending heartbeats, is
+    started again.
+
+    submit() only writes to Redis, so it works from a serverless function.
+    The jobs are run by separate worker processes (`python
+    optimization_jobs.py`, see work()), which also keeps the CPU-bound
+    search out of the web process.
+    """
+    def __init__(self, run, queue_limit=OPTIMIZE_JOB_QUEUE_LIMIT):
+        self.run = run
+        self.queue_limit = queue_limit
+        self.lock = threading.Lock()
+        self.live_keys = set()  # keys of the jobs this worker is running
+        self.heartbeat = None
+
+    def submit(self, job_id, args):
+        """
+        Queues a job unless a live or finished one with this id exists.
+        `args` must be JSON serializable. Returns True if it was created,
+        False if the submission joined an existing job. Raises JobQueueFull
+        when the queue already holds `queue_limit` jobs.
+        """
+        redis_client = get_redis_client()
+        key = job_key(job_id)
+        if not _replaceable(redis_client, job_id, redis_client.hgetall(key)):
+            return False
+        request = json.dumps(args, separators=(',', ':'))
+
+        def create(pipe):
+            if not _replaceable(pipe, job_id, pipe.hgetall(key)):
+                return False
+            queued = pipe.llen(REDIS_JOB_QUEUE_KEY)
+            if queued >= self.queue_limit:
+                raise JobQueueFull(f"{queued} optimization jobs are already queued")
+            now = repr(time.time())
+            pipe.multi()
+            pipe.delete(key)
+            pipe.hset(key, mapping={'status': 'queued', 'progress': 0, 'created_at': now, 'heartbeat_at': now,
+                                    'request': request})
+            pipe.expire(key, OPTIMIZE_JOB_TTL_SECONDS)
+            pipe.lrem(REDIS_JOB_QUEUE_KEY, 0, job_id)
+            pipe.lpush(REDIS_JOB_QUEUE_KEY, job_id)
+            return True
+        # The hash, its TTL and the queue entry are written in one
+        # transaction; WATCH decides between concurrent submissions.
+        return redis_client.transaction(create, key, REDIS_JOB_QUEUE_KEY, value_from_callable=True)
+
+    def work(self, timeout=None):
+        """
+        Runs queued jobs one at a time, waiting for new ones, until `timeout`
+        seconds pass without any (None: forever). Start one worker process
+        per job that should run at the same time.
+        """
+        redis_client = get_redis_client()
+        with self.lock:
+            if self.heartbeat is None:
+                self.heartbeat = threading.Thread(target=self._beat, name='optimize-job-heartbeat', daemon=True)
+                self.heartbeat.start()
+        while True:
+            popped = redis_client.brpop(REDIS_JOB_QUEUE_KEY, timeout=timeout or 0)
+            if popped is None:
+                return
+            self._execute(popped[1].decode())
+
+    def _claim(self, redis_client, key):
+        """Marks a queued job running; returns its decoded args, or None if it expired or was taken over."""
+        def claim(pipe):
+            fields = pipe.hgetall(key)
+            if fields.get(b'status') != b'queued':
+                return None
+            now = repr(time.time())
+            pipe.multi()
+            pipe.hset(key, mapping={'status': 'running', 'started_at': now, 'heartbeat_at': now})
+            pipe.expire(key, OPTIMIZE_JOB_TTL_SECONDS)
+            return json.loads(fields[b'request'])
+        return redis_client.transaction(claim, key, value_from_callable=True)
+
+    def _beat(self):
+        while True:
+            time.sleep(JOB_HEARTBEAT_INTERVAL_SECONDS)
+            with self.lock:
+                keys = list(self.live_keys)
+            if not keys:
+                continue
+            try:
+                pipe = get_redis_client().pipeline(transaction=False)
+                now = repr(time.time())
+                for key in keys:
+                    pipe.hset(key, 'heartbeat_at', now)
+                    pipe.expire(key, OPTIMIZE_JOB_TTL_SECONDS)
+                pipe.execute()
+            except Exception as e:
+                print(f"WARNING: Could not write optimization job heartbeats to Redis. Reason: {e}")
+
+    def _execute(self, job_id):
+        redis_client = get_redis_client()
+        key = job_key(job_id)
+        args = self._claim(redis_client, key)
+        if args is None:
+            return
+        with self.lock:
+            self.live_keys.add(key)
+        try:
+            results = self.run(*args, progress=_ProgressWriter(key))
+            self._finish(key, status='done', progress=1, result=encode_result(results))
+        except Exception as e:
+            print(f"ERROR: Optimization job {job_id} failed. Reason: {e}")
+            try:
+                self._finish(key, status='failed', error=str(e))
+            except Exception as e:
+                print(f"ERROR: Could not record the failure of job {job_id}. Reason: {e}")
+        finally:
+            with self.lock:
+                self.live_keys.discard(key)
+
+    def _finish(self, key, **fields):
+        pipe = get_redis_client().pipeline(transaction=True)
+        pipe.hset(key, mapping=dict(fields, finished_at=repr(time.time())))
+        pipe.hdel(key, 'request')
+        pipe.expire(key, OPTIMIZE_JOB_TTL_SECONDS)
+        pipe.execute()
+
+
+class _ProgressWriter:
+    def __init__(self, key):
+        self.key = key
+        self.written_at = 0.0
+
+    def __call__(self, fraction):
+        now = time.monotonic()
+        if now - self.written_at < PROGRESS_WRITE_INTERVAL_SECONDS:
+            return
+        self.written_at = now
+        try:
+            get_redis_client().hset(self.key, 'progress', round(fraction, 3))
+        except Exception as e:
+            print(f"WARNING: Could not update job progress in Redis. Reason: {e}")
+
+
+def _stale(redis_client, job_id, fields):
+    """
+    Whether a running job's worker stopped sending heartbeats, or a queued
+    job was popped by a worker that stopped before marking it running.
+    """
+    status = fields.get(b'status')
+    if status not in (b'queued', b'running'):
+        return False
+    if time.time() - float(fields.get(b'heartbeat_at', 0)) <= OPTIMIZE_JOB_STALE_SECONDS:
+        return False
+    return status == b'running' or redis_client.lpos(REDIS_JOB_QUEUE_KEY, job_id) is None
+
+
+def _replaceable(redis_client, job_id, fields):
+    """Whether a submission may start the job over: it is unknown, expired, failed or stale."""
+    return b'status' not in fields or fields[b'status'] == b'failed' or _stale(redis_client, job_id, fields)
+
+
+def get_job(job_id):
+    """
+    Returns the job's status dict, with `result` once done, or None if
+    unknown or expired. A stale job is reported as failed.
+    """
+    redis_client = get_redis_client()
+    fields = redis_client.hgetall(job_key(job_id))
+    if not fields or b'status' not in fields:
+        return None
+    stale = _stale(redis_client, job_id, fields)
+    fields = {name.decode(): value for name, value in fields.items()}
+    job = {'job_id': job_id, 'status': fields['status'].decode(), 'progress': float(fields.get('progress', 0))}
+    if stale:
+        job.update(status='failed', error="The worker running this job stopped; submit it again to restart it")
+    for name in ('created_at', 'started_at', 'heartbeat_at', 'finished_at'):
+        if name in fields:
+            job[name] = float(fields[name])
+    if 'result' in fields:
+        job['result'] = decode_result(fields['result'])
+    if 'error' in fields:
+        job['error'] = fields['error'].decode()
+    return job
+
+
+if __name__ == '__main__':
+    # The worker runs the same optimization as the web app's jobs.
+    from main import optimization_jobs
+    optimization_jobs.work()
@@ -1,10 +1,19 @@
-import networkx as nx
+import hashlib
+import json
 import random
 import math
 import copy
+import os
+import re
 from datetime import datetime, timedelta
 import sys
+import time
 import heapq
+from array import array
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+from bisect import bisect_left, bisect_right, insort
 from itertools import islice
 
 # ==============================================================================
@@ -17,6 +26,67 @@ TRAIN_PRECEDENCE = {
     'Freight': 1
 }
 
+# Action codes stored in PathBasedSolution.actions.
+HOLD, PROCEED = 0, 1
+ACTION_NAMES = ('HOLD', 'PROCEED')
+
+# Search modes of execute_module: simulated annealing, or greedy_dispatch
+# alone for millisecond responses.
+SEARCH_MODES = ('anneal', 'greedy')
+
+# Minutes taken off the cost for every train that proceeds.
+THROUGHPUT_BONUS = 100
+
+# Annealing stops once the temperature falls to this value.
+MIN_TEMPERATURE = 0.01
+
+# Iterations without a new best after which a time-budgeted search stops.
+DEFAULT_STAGNATION_WINDOW = 1500
+
+# The stagnation window only counts once the temperature is below this share
+# of the initial temperature.
+STAGNATION_TEMPERATURE_SHARE = 0.01
+
+# Share of a time budget given to the search; the rest covers the final
+# replay and building the response.
+SEARCH_BUDGET_SHARE = 0.9
+
+# Rolling horizon (see rolling_horizon_annealing): each window is optimized
+# together with the trains arriving this many minutes after it, whose
+# decisions are left to the next window.
+HORIZON_OVERLAP_MINUTES = 30
+
+# Warm starts (see warm_start_annealing): the previous solution is reused
+# when at least this share of the trains carries over, up to this many new
+# or affected trains are seeded greedily, and the reheat phase runs this
+# many iterations from a temperature calibrated on this many sampled moves
+# to accept this share of uphill moves.
+WARM_START_MIN_OVERLAP = 0.5
+WARM_START_MAX_SEEDED = 32
+WARM_START_ITERATIONS = 400
+WARM_START_SAMPLES = 30
+WARM_START_ACCEPTANCE = 0.2
+
+# Replay times are integer microseconds from the earliest arrival.
+MICROSECOND = timedelta(microseconds=1)
+
+# Maximum number of (topology, closure set) path catalogs kept in memory.
+PATH_CATALOG_MAX_ENTRIES = 32
+
+# Candidate paths considered per entry/exit pair: the shortest by travel time.
+MAX_CANDIDATE_PATHS = 5
+
+# Paths kept per entry/exit pair in a path table. The surplus over
+# MAX_CANDIDATE_PATHS lets most closure sets be served by filtering it.
+PATH_TABLE_DEPTH = 2 * MAX_CANDIDATE_PATHS
+
+# Station topology used by NetworkTimeState: segments with travel minutes,
+# dwell minutes per train type and platform tracks. Its path table, written
+# by build_path_table.py, sits next to it as <name>.paths.json; without one
+# candidate paths are computed with networkx on first use of each pair.
+TOPOLOGY_FILE = os.environ.get('TOPOLOGY_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                             'topologies', 'station.json'))
+
 # ==============================================================================
 # 1. CORE CLASSES
 # ==============================================================================
@@ -29,21 +99,24 @@ class DelayFactors:
         return self.chain_pull_delay + self.loco_pilot_delay + self.ml_weather_delay
 
 class NetworkTimeState:
-    def __init__(self):
-        self.edge_travel_times = {
-            ('Entry_1', 'A'): 3, ('Entry_4', 'A'): 2, ('Entry_2', 'B'): 4, ('Entry_5', 'B'): 3,
-            ('Entry_3', 'C'): 5, ('Entry_6', 'C'): 3, ('F', 'Entry_10'): 3, ('F', 'Entry_12'): 3,
-            ('E', 'Entry_9'): 4, ('E', 'Entry_11'): 2, ('D', 'Entry_7'): 2, ('D', 'Entry_8'): 4,
-            ('A', 'P1_entry'): 2, ('P1_exit', 'F'): 2, ('B', 'P2_entry'): 2, ('P2_exit', 'E'): 2,
-            ('C', 'P3_entry'): 2, ('P3_exit', 'D'): 2, ('A', 'B'): 1.5, ('B', 'A'): 1.5,
-            ('E', 'F'): 1.5, ('F', 'E'): 1.5, ('P1_entry', 'P1_exit'): 5,
-            ('P2_entry', 'P2_exit'): 5, ('P3_entry', 'P3_exit'): 5,
-        }
-        self.dwell_times = {'Passenger': 3, 'Special': 2, 'Freight': 8, 'Local': 5}
+    """
+    The station topology of `topology_file` (TOPOLOGY_FILE by default).
+    The file is read once per process and its dicts are shared by every
+    instance, so treat them as read-only. `platforms` maps platform names
+    to their (entry, exit) track segment, where trains dwell.
+    """
+    def __init__(self, topology_file=None):
+        self.topology_file = topology_file or TOPOLOGY_FILE
+        topology = load_topology(self.topology_file)
+        self.edge_travel_times = topology['edge_travel_times']
+        self.dwell_times = topology['dwell_times']
+        self.platforms = topology['platforms']
+        self.topology_key = topology['key']
 
 class TrainJourney:
     def __init__(self, train_id, entry_node, exit_node, scheduled_entry_time,
-                 train_type, network_state, scheduled_exit_time=None, non_functional_segments=None, delay_factors=None):
+                 train_type, network_state, scheduled_exit_time=None, non_functional_segments=None, delay_factors=None,
+                 path_catalog=None):
         self.train_id = train_id
         self.entry_node = entry_node
         self.exit_node = exit_node
@@ -51,137 +124,1279 @@ class TrainJourney:
         self.train_type = train_type
         self.delay_factors = delay_factors or DelayFactors()
         self.actual_arrival_time = scheduled_entry_time + timedelta(minutes=self.delay_factors.total_delay())
-        ideal_graph = create_graph_from_data(network_state)
-        ideal_paths = find_all_possible_paths(ideal_graph, self.entry_node, self.exit_node)
-        self.ideal_path = min(ideal_paths, key=len) if ideal_paths else None
-        current_graph = create_graph_from_data(network_state, non_functional_segments)
-        self.possible_paths = find_all_possible_paths(current_graph, self.entry_node, self.exit_node)
-        self.default_path = min(self.possible_paths, key=len) if self.possible_paths else None
+        # Paths are shared, read-only entries of the catalog; never mutate them.
+        catalog = path_catalog or get_path_catalog(network_state, non_functional_segments)
+        self.ideal_path, self.possible_paths, self.default_path = catalog.lookup(self.entry_node, self.exit_node)
+        self.default_path_index = self.possible_paths.index(self.default_path) if self.default_path else -1
+        self.network = catalog.network
+        self.possible_path_edges = catalog.path_edges(self.entry_node, self.exit_node)
 
 # ==============================================================================
 # 2. HELPER FUNCTIONS
 # ==============================================================================
+def _stage(timer, name):
+    """timer.stage(name) when the caller times stages (see metrics.StageTimer), else a no-op."""
+    return timer.stage(name) if timer is not None else nullcontext()
+
+def normalize_segments(non_functional_segments):
+    """JSON bodies deliver segments as lists; edges are keyed by tuples."""
+    return frozenset(tuple(seg) for seg in (non_functional_segments or ()))
+
+_topologies = {}
+
+def load_topology(topology_file):
+    """
+    {'edge_travel_times', 'dwell_times', 'platforms', 'key'} read from a
+    topology file, cached per process. A file without `platforms` gets one
+    per '<X>_entry' -> '<X>_exit' segment. `key` identifies the content.
+    """
+    topology = _topologies.get(topology_file)
+    if topology is None:
+        with open(topology_file) as f:
+            data = json.load(f)
+        edge_travel_times = {(u, v): minutes for u, v, minutes in data['edges']}
+        if 'platforms' in data:
+            platforms = {name: tuple(track) for name, track in data['platforms'].items()}
+        else:
+            platforms = _named_platforms(edge_travel_times)
+        canonical = json.dumps([data['edges'], data['dwell_times'], list(platforms.items())], separators=(',', ':'))
+        topology = _topologies[topology_file] = {
+            'edge_travel_times': edge_travel_times,
+            'dwell_times': data['dwell_times'],
+            'platforms': platforms,
+            'key': hashlib.sha256(canonical.encode()).hexdigest(),
+        }
+    return topology
+
+def _named_platforms(edge_travel_times):
+    """'P1_entry' -> 'P1_exit' is 'Platform 1'; any other '<X>_entry' -> '<X>_exit' is 'Platform <X>'."""
+    platforms = {}
+    for u, v in edge_travel_times:
+        if u.endswith('_entry') and v == u[:-len('_entry')] + '_exit':
+            platform_id = u[:-len('_entry')]
+            match = re.fullmatch(r'P(\d+)', platform_id)
+            platforms[f"Platform {match.group(1) if match else platform_id}"] = (u, v)
+    return platforms
+
 def create_graph_from_data(network_state, non_functional_segments=None):
+    import networkx as nx
     G = nx.DiGraph()
-    non_functional = non_functional_segments or set()
+    non_functional = normalize_segments(non_functional_segments)
     for edge, time in network_state.edge_travel_times.items():
         if edge not in non_functional:
             G.add_edge(edge[0], edge[1], weight=time)
     return G
 
-def find_all_possible_paths(graph, start_node, end_node):
+def find_all_possible_paths(graph, start_node, end_node, k=MAX_CANDIDATE_PATHS):
+    """The k shortest simple paths by travel time (Yen's algorithm), shortest first."""
+    import networkx as nx
+    # networkx reads a target missing from the graph as a collection of
+    # targets (the characters of its name), so that case is answered here.
+    if start_node not in graph or end_node not in graph:
+        return []
     try:
-        return list(islice(nx.all_simple_paths(graph, source=start_node, target=end_node), 5))
+        return list(islice(nx.shortest_simple_paths(graph, source=start_node, target=end_node, weight='weight'), k))
     except (nx.NetworkXNoPath, nx.NodeNotFound):
         return []
 
+def path_table_file(topology_file):
+    return os.path.splitext(topology_file)[0] + '.paths.json'
+
+def build_path_table(network_state, depth=PATH_TABLE_DEPTH):
+    """
+    The `depth` shortest paths from every entry node (no incoming segment)
+    to every exit node (no outgoing segment), keyed to the topology. Pairs
+    without a path are left out.
+    """
+    graph = create_graph_from_data(network_state)
+    entries = [node for node in graph if graph.in_degree(node) == 0]
+    exits = [node for node in graph if graph.out_degree(node) == 0]
+    pairs = [(u, v, find_all_possible_paths(graph, u, v, depth)) for u in entries for v in exits]
+    return {
+        'topology_key': network_state.topology_key,
+        'depth': depth,
+        'entries': entries,
+        'exits': exits,
+        'paths': [[u, v, paths] for u, v, paths in pairs if paths],
+    }
+
+class PathTable:
+    """
+    A topology's prebuilt candidate paths: up to `depth` shortest paths per
+    entry/exit pair, shortest first. A pair with fewer has no others.
+    """
+    def __init__(self, data):
+        self.depth = data['depth']
+        self.entries, self.exits = set(data['entries']), set(data['exits'])
+        self.paths = {(u, v): paths for u, v, paths in data['paths']}
+
+    def lookup(self, entry_node, exit_node):
+        """(ranked paths, complete) for a pair of the table, else None."""
+        if entry_node not in self.entries or exit_node not in self.exits:
+            return None
+        paths = self.paths.get((entry_node, exit_node), [])
+        return paths, len(paths) < self.depth
+
+_path_tables = {}
+
+def load_path_table(network_state):
+    """
+    The PathTable next to the topology file, or None if it is missing or
+    was built for a different version of the topology.
+    """
+    topology_file = network_state.topology_file
+    if topology_file not in _path_tables:
+        table = None
+        try:
+            with open(path_table_file(topology_file)) as f:
+                data = json.load(f)
+            if data['topology_key'] == network_state.topology_key:
+                table = PathTable(data)
+            else:
+                print(f"WARNING: Path table of {topology_file} is out of date; rebuild it with build_path_table.py.")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"WARNING: Path table unavailable, computing paths with networkx. Reason: {e}")
+        _path_tables[topology_file] = table
+    return _path_tables[topology_file]
+
+def _open_paths(ranked_paths, closed_segments):
+    """The first MAX_CANDIDATE_PATHS of `ranked_paths` that avoid every closed segment."""
+    paths = []
+    for path in ranked_paths:
+        if closed_segments and any(segment in closed_segments for segment in zip(path, path[1:])):
+            continue
+        paths.append(path)
+        if len(paths) == MAX_CANDIDATE_PATHS: break
+    return paths
+
+class CompiledNetwork:
+    """
+    The topology interned to integer ids for the event loop. Edge i runs
+    from node edge_start[i] to edge_end[i]; `segments` and `node_names` map
+    ids back to names when results are reported.
+    """
+    def __init__(self, network_state):
+        self.node_names, self.node_ids = [], {}
+        self.segments, self.edge_ids = [], {}
+        self.edge_start, self.edge_end, self.edge_minutes, self.edge_has_dwell = [], [], [], []
+        platform_tracks = set(network_state.platforms.values())
+        for segment, minutes in network_state.edge_travel_times.items():
+            self.edge_ids[segment] = len(self.segments)
+            self.segments.append(segment)
+            self.edge_start.append(self._intern(segment[0]))
+            self.edge_end.append(self._intern(segment[1]))
+            self.edge_minutes.append(minutes)
+            self.edge_has_dwell.append(segment in platform_tracks)
+        self._durations = {}
+
+    def _intern(self, node):
+        if node not in self.node_ids:
+            self.node_ids[node] = len(self.node_names)
+            self.node_names.append(node)
+        return self.node_ids[node]
+
+    def path_edges(self, path):
+        return tuple(self.edge_ids[(path[k], path[k + 1])] for k in range(len(path) - 1))
+
+    def edge_durations(self, dwell_minutes):
+        """
+        Microseconds to clear each edge for a train with this dwell time.
+        Minutes go through timedelta, as datetime arithmetic would, so
+        integer replay times match the datetime ones exactly.
+        """
+        durations = self._durations.get(dwell_minutes)
+        if durations is None:
+            durations = self._durations[dwell_minutes] = [
+                timedelta(minutes=minutes + dwell_minutes if has_dwell else minutes) // MICROSECOND
+                for minutes, has_dwell in zip(self.edge_minutes, self.edge_has_dwell)]
+        return durations
+
+class PathCatalog:
+    """
+    Candidate entry->exit paths for one topology and one set of closed
+    segments. Each pair is enumerated once and then served from memory.
+    """
+    def __init__(self, network_state, non_functional_segments=frozenset(), ideal_catalog=None):
+        self.network_state = network_state
+        self.non_functional_segments = non_functional_segments
+        # The ideal path ignores closures, so it comes from the closure-free catalog.
+        self.ideal_catalog = ideal_catalog or self
+        self.network = ideal_catalog.network if ideal_catalog else CompiledNetwork(network_state)
+        self.path_table = ideal_catalog.path_table if ideal_catalog else load_path_table(network_state)
+        self._graph = None
+        self._paths = {}
+        self._entries = {}
+        self._edges = {}
+
+    @property
+    def graph(self):
+        # Only built for pairs the path table cannot answer.
+        if self._graph is None:
+            self._graph = create_graph_from_data(self.network_state, self.non_functional_segments)
+        return self._graph
+
+    def possible_paths(self, entry_node, exit_node):
+        key = (entry_node, exit_node)
+        paths = self._paths.get(key)
+        if paths is None:
+            ranked = self.path_table.lookup(entry_node, exit_node) if self.path_table is not None else None
+            if ranked is not None:
+                paths = _open_paths(ranked[0], self.non_functional_segments)
+                if len(paths) < MAX_CANDIDATE_PATHS and not ranked[1]:
+                    paths = None  # the closures removed too many of the stored paths
+            if paths is None:
+                paths = find_all_possible_paths(self.graph, entry_node, exit_node)
+            self._paths[key] = paths
+        return paths
+
+    def lookup(self, entry_node, exit_node):
+        """Returns (ideal_path, possible_paths, default_path) for a pair."""
+        key = (entry_node, exit_node)
+        entry = self._entries.get(key)
+        if entry is None:
+            ideal_paths = self.ideal_catalog.possible_paths(entry_node, exit_node)
+            possible_paths = self.possible_paths(entry_node, exit_node)
+            entry = self._entries[key] = (
+                min(ideal_paths, key=len) if ideal_paths else None,
+                possible_paths,
+                min(possible_paths, key=len) if possible_paths else None,
+            )
+        return entry
+
+    def path_edges(self, entry_node, exit_node):
+        """possible_paths of a pair as tuples of CompiledNetwork edge ids."""
+        key = (entry_node, exit_node)
+        edges = self._edges.get(key)
+        if edges is None:
+            edges = self._edges[key] = [self.network.path_edges(path) for path in self.possible_paths(entry_node, exit_node)]
+        return edges
+
+_path_catalogs = OrderedDict()
+_path_catalogs_lock = threading.Lock()
+
+def get_path_catalog(network_state, non_functional_segments=None):
+    """
+    Returns the memoized PathCatalog for this topology and closure set,
+    building it on first use. Least recently used catalogs are evicted.
+    """
+    closures = normalize_segments(non_functional_segments)
+    key = (network_state.topology_key, closures)
+    with _path_catalogs_lock:
+        catalog = _path_catalogs.get(key)
+        if catalog is not None:
+            _path_catalogs.move_to_end(key)
+            return catalog
+    ideal_catalog = get_path_catalog(network_state) if closures else None
+    catalog = PathCatalog(network_state, closures, ideal_catalog)
+    with _path_catalogs_lock:
+        catalog = _path_catalogs.setdefault(key, catalog)
+        _path_catalogs.move_to_end(key)
+        while len(_path_catalogs) > PATH_CATALOG_MAX_ENTRIES:
+            _path_catalogs.popitem(last=False)
+    return catalog
+
+def clear_path_catalogs():
+    with _path_catalogs_lock:
+        _path_catalogs.clear()
+
 # ==============================================================================
 # 3. CORE OR ALGORITHM
 # ==============================================================================
 class PathBasedSolution:
+    """
+    Decisions are two integer arrays aligned with `train_ids`: the action
+    code and the index into that journey's possible_paths (-1 for none).
+    Journeys are shared and read-only, so copies only duplicate the arrays.
+    """
     def __init__(self, train_journeys):
         self.train_journeys = {tj.train_id: tj for tj in train_journeys}
-        self.decisions = {}
-        for tid, journey in self.train_journeys.items():
-            self.decisions[tid] = {'action': 'PROCEED', 'path': journey.default_path} if journey.possible_paths else {'action': 'HOLD', 'path': None}
+        self.train_ids = list(self.train_journeys)
+        self.journeys = list(self.train_journeys.values())
+        self.reroutable = [i for i, journey in enumerate(self.journeys) if len(journey.possible_paths) > 1]
+        self.actions = array('b', (PROCEED if journey.possible_paths else HOLD for journey in self.journeys))
+        self.path_indices = array('i', (journey.default_path_index for journey in self.journeys))
 
-def calculate_objective_cost(solution, network_state):
-    track_occupancy, node_occupancy = {}, {}
-    individual_delays = {tid: 0 for tid in solution.train_journeys.keys()}
-    event_queue, conflicts_detected = [], []
-    actual_finish_times = {}
-    actual_timelines = {tid: {} for tid in solution.train_journeys.keys()}
-    for tid, decision in solution.decisions.items():
-        if decision['action'] == 'PROCEED' and decision['path']:
-            heapq.heappush(event_queue, (solution.train_journeys[tid].actual_arrival_time, tid, 0))
-    processed_events = {}
+    def copy(self):
+        clone = copy.copy(self)
+        clone.actions, clone.path_indices = array('b', self.actions), array('i', self.path_indices)
+        return clone
+
+    def load(self, other):
+        """Overwrites these decisions with another solution's over the same journeys."""
+        self.actions[:], self.path_indices[:] = other.actions, other.path_indices
+
+    def path(self, index):
+        path_index = self.path_indices[index]
+        return self.journeys[index].possible_paths[path_index] if path_index >= 0 else None
+
+    @property
+    def decisions(self):
+        """Reporting view: {train_id: {'action': 'PROCEED' | 'HOLD', 'path': [...] | None}}."""
+        return {tid: {'action': ACTION_NAMES[self.actions[i]], 'path': self.path(i)} for i, tid in enumerate(self.train_ids)}
+
+class SimulationContext:
+    """
+    Per-solution inputs of the event loop, resolved once: arrival times as
+    integer microseconds from `epoch`, heap tie-break ranks (the train id
+    order), precedence levels and each train's per-edge clearing times.
+
+    A `boundary` (epoch, track_exit, node_exit, latest_finish_by_level)
+    carries the exit times left by trains outside the solution, e.g. an
+    earlier rolling-horizon window, and their latest finish per precedence
+    level; every replay then starts from those exit times instead of an
+    empty network, and held trains wait at least until those finishes.
+    """
+    def __init__(self, solution, network_state, boundary=None):
+        journeys = solution.journeys
+        self.network_state = network_state
+        self.network = journeys[0].network if journeys else None
+        self.train_ids = solution.train_ids
+        self.epoch = min((journey.actual_arrival_time for journey in journeys), default=None)
+        self.arrivals = [(journey.actual_arrival_time - self.epoch) // MICROSECOND for journey in journeys]
+        self.ranks = [0] * len(journeys)
+        for rank, index in enumerate(sorted(range(len(journeys)), key=self.train_ids.__getitem__)):
+            self.ranks[index] = rank
+        self.levels = [TRAIN_PRECEDENCE.get(journey.train_type, 0) for journey in journeys]
+        self.path_edges = [journey.possible_path_edges for journey in journeys]
+        self.durations = [self.network.edge_durations(network_state.dwell_times.get(journey.train_type, 3))
+                          for journey in journeys]
+        self.initial_exits, self.initial_finishes = None, {}
+        if boundary is not None and journeys:
+            boundary_epoch, track_exit, node_exit, latest_finish_by_level = boundary
+            offset = (boundary_epoch - self.epoch) // MICROSECOND
+            self.initial_exits = ([exit_time + offset if exit_time >= 0 else -1 for exit_time in track_exit],
+                                  [exit_time + offset if exit_time >= 0 else -1 for exit_time in node_exit])
+            self.initial_finishes = {level: finish_time + offset for level, finish_time in latest_finish_by_level.items()}
+
+    def arrival_event(self, index):
+        return (self.arrivals[index], self.ranks[index], 0, index)
+
+    def to_datetime(self, micros):
+        return self.epoch + timedelta(microseconds=micros)
+
+def _simulation_context(solution, network_state):
+    """Contexts are shared by copies of a solution, like its journeys."""
+    context = getattr(solution, 'simulation_context', None)
+    if context is None or context.network_state is not network_state:
+        context = solution.simulation_context = SimulationContext(solution, network_state)
+    return context
+
+class SimulationRun:
+    """
+    One discrete-event replay of a solution. Besides the results it keeps
+    append-only event logs and periodic checkpoints of the replay state, so
+    ObjectiveEvaluator can resume a neighbour from the last checkpoint
+    before the first event the neighbour changes. Times are integer
+    microseconds; datetimes and conflict text are only built by results().
+    """
+    def __init__(self, solution, context):
+        self.context = context
+        self.actions = array('b', solution.actions)  # decisions at replay time
+        self.path_indices = array('i', solution.path_indices)
+        self.arrival_events = []  # sorted first events of proceeding trains
+        self.checkpoints, self.checkpoint_keys = [], []
+        self.timeline_log, self.conflict_log, self.processed_log, self.finish_log = [], [], [], []
+        self.wait_delays = array('d', bytes(8 * len(solution.actions)))
+        self.checkpoint_interval = 0
+        self.cost = None
+
+    def results(self, solution):
+        """Same (cost, delays, conflicts, timelines) tuple as calculate_objective_cost."""
+        context = self.context
+        train_ids = context.train_ids
+        latest_finish_by_level = _latest_finish_by_level(context, self.finish_log)
+        individual_delays = {}
+        for i, tid in enumerate(train_ids):
+            if self.actions[i] == PROCEED:
+                individual_delays[tid] = self.wait_delays[i]
+            else:
+                individual_delays[tid] = _held_delay(context, i, latest_finish_by_level)
+        conflicts_detected = []
+        for entry_time, index, holder, start_node, wait_time in self.conflict_log:
+            train_id, conflicting_train = train_ids[index], train_ids[holder]
+            conflicts_detected.append({'time': context.to_datetime(entry_time).strftime('%H:%M'), 'trains': [train_id, conflicting_train], 'location': f"Junction {context.network.node_names[start_node]}", 'severity': 'medium', 'resolution': f"HOLD {train_id} for {wait_time:.2f} min"})
+        actual_timelines = {tid: {} for tid in train_ids}
+        segments = context.network.segments if context.network else ()
+        for i, edge, entry_time, exit_time in self.timeline_log:
+            actual_timelines[train_ids[i]][segments[edge]] = (context.to_datetime(entry_time), context.to_datetime(exit_time))
+        return self.cost, individual_delays, conflicts_detected, actual_timelines
+
+def _replay(run, event_queue, occupancy, event_count=0):
+    """Drains the event queue, appending to the run's logs and checkpoints."""
+    if run.context.network is None:
+        return  # no trains
+    context, path_indices, wait_delays, checkpoint_interval = run.context, run.path_indices, run.wait_delays, run.checkpoint_interval
+    path_edges, durations = context.path_edges, context.durations
+    edge_start, edge_end = context.network.edge_start, context.network.edge_end
+    track_exit, track_holder, node_exit, node_holder = occupancy
+    timeline_log, finish_log = run.timeline_log, run.finish_log
+    processed_events = set(run.processed_log)
+    heappop, heappush = heapq.heappop, heapq.heappush
     while event_queue:
-        current_time, train_id, path_idx = heapq.heappop(event_queue)
-        path = solution.decisions[train_id]['path']
-        if path_idx >= len(path) - 1:
-            actual_finish_times[train_id] = current_time
+        if checkpoint_interval and event_count % checkpoint_interval == 0:
+            run.checkpoint_keys.append(event_queue[0])
+            # Arrival events are rebuilt from run.arrival_events on resume, so
+            # only trains already under way need to be kept.
+            in_flight = [event for event in event_queue if event[2] > 0]
+            run.checkpoints.append((event_count, in_flight, [list(table) for table in occupancy],
+                                    array('d', wait_delays), len(timeline_log), len(run.conflict_log),
+                                    len(run.processed_log), len(finish_log)))
+        event_count += 1
+        current_time, rank, step, index = heappop(event_queue)
+        edges = path_edges[index][path_indices[index]]
+        if step >= len(edges):
+            finish_log.append((index, current_time))
             continue
-        segment = (path[path_idx], path[path_idx + 1])
-        start_node, end_node = segment
-        last_track_exit, track_holder = track_occupancy.get(segment, (datetime.min, None))
-        last_node_exit, node_holder = node_occupancy.get(start_node, (datetime.min, None))
+        edge = edges[step]
+        start_node = edge_start[edge]
+        last_track_exit, last_node_exit = track_exit[edge], node_exit[start_node]
         entry_time = max(current_time, last_track_exit, last_node_exit)
-        wait_time = (entry_time - current_time).total_seconds() / 60
-        if wait_time > 0.1:
-            conflicting_train = track_holder if last_track_exit > last_node_exit else node_holder
-            if conflicting_train and (train_id, conflicting_train) not in processed_events:
-                conflicts_detected.append({'time': entry_time.strftime('%H:%M'), 'trains': [train_id, conflicting_train], 'location': f"Junction {start_node}", 'severity': 'medium', 'resolution': f"HOLD {train_id} for {wait_time:.2f} min"})
-                processed_events[(train_id, conflicting_train)] = True
-        individual_delays[train_id] += wait_time
-        journey = solution.train_journeys[train_id]
-        travel_time = network_state.edge_travel_times.get(segment, 2)
-        if start_node.endswith('_entry'):
-            travel_time += network_state.dwell_times.get(journey.train_type, 3)
-        exit_time = entry_time + timedelta(minutes=travel_time)
-        track_occupancy[segment] = (exit_time, train_id)
-        node_occupancy[end_node] = (exit_time, train_id)
-        actual_timelines[train_id][segment] = (entry_time, exit_time)
-        heapq.heappush(event_queue, (exit_time, train_id, path_idx + 1))
+        if entry_time > current_time:
+            # Same float as timedelta.total_seconds() / 60 on the datetimes.
+            wait_time = (entry_time - current_time) / 1000000 / 60
+            if wait_time > 0.1:
+                holder = track_holder[edge] if last_track_exit > last_node_exit else node_holder[start_node]
+                if holder >= 0 and (index, holder) not in processed_events:
+                    run.conflict_log.append((entry_time, index, holder, start_node, wait_time))
+                    processed_events.add((index, holder))
+                    run.processed_log.append((index, holder))
+            wait_delays[index] += wait_time
+        exit_time = entry_time + durations[index][edge]
+        end_node = edge_end[edge]
+        track_exit[edge], track_holder[edge] = exit_time, index
+        node_exit[end_node], node_holder[end_node] = exit_time, index
+        timeline_log.append((index, edge, entry_time, exit_time))
+        heappush(event_queue, (exit_time, rank, step + 1, index))
+
+def _empty_occupancy(context):
+    """[track_exit, track_holder, node_exit, node_holder]; -1 means never used."""
+    edge_count = len(context.network.segments) if context.network else 0
+    node_count = len(context.network.node_names) if context.network else 0
+    return [[-1] * edge_count, [-1] * edge_count, [-1] * node_count, [-1] * node_count]
 
+def _initial_occupancy(context):
+    """_empty_occupancy with the context's boundary exit times, if any; their holders are unknown."""
+    occupancy = _empty_occupancy(context)
+    if context.initial_exits is not None:
+        occupancy[0], occupancy[2] = list(context.initial_exits[0]), list(context.initial_exits[1])
+    return occupancy
+
+def _latest_finish_by_level(context, finish_log):
+    # A held train waits for every train of equal or higher precedence to clear,
+    # so only the latest finish per precedence level matters.
+    latest_finish_by_level = dict(context.initial_finishes)
+    for index, finish_time in finish_log:
+        level = context.levels[index]
+        if level not in latest_finish_by_level or finish_time > latest_finish_by_level[level]:
+            latest_finish_by_level[level] = finish_time
+    return latest_finish_by_level
+
+def _held_delay(context, index, latest_finish_by_level):
+    level, arrival = context.levels[index], context.arrivals[index]
+    latest_clear_time = arrival
+    for other_level, finish_time in latest_finish_by_level.items():
+        if other_level >= level and finish_time > latest_clear_time: latest_clear_time = finish_time
+    held_delay = (latest_clear_time - arrival) / 1000000 / 60
+    return max(0, held_delay)
+
+def _score_run(run):
+    context = run.context
+    latest_finish_by_level = _latest_finish_by_level(context, run.finish_log)
     total_delay, throughput_bonus = 0, 0
-    for tid, decision in solution.decisions.items():
-        journey = solution.train_journeys[tid]
-        if decision['action'] == 'PROCEED' and decision['path']:
-            total_delay += individual_delays[tid]
-            throughput_bonus += 100
+    for i, action in enumerate(run.actions):
+        if action == PROCEED:
+            total_delay += run.wait_delays[i]
+            throughput_bonus += THROUGHPUT_BONUS
+        else:
+            total_delay += _held_delay(context, i, latest_finish_by_level)
+    run.cost = total_delay - throughput_bonus
+    return run
+
+def _simulate(solution, network_state, checkpoint_interval=0):
+    """Full replay from an empty network."""
+    context = _simulation_context(solution, network_state)
+    run = SimulationRun(solution, context)
+    run.arrival_events = sorted(context.arrival_event(i) for i, action in enumerate(run.actions) if action == PROCEED)
+    if checkpoint_interval is None:
+        expected_events = sum(len(solution.path(i)) for _, _, _, i in run.arrival_events)
+        checkpoint_interval = max(16, expected_events // ObjectiveEvaluator.CHECKPOINT_COUNT)
+    run.checkpoint_interval = checkpoint_interval
+    _replay(run, list(run.arrival_events), _initial_occupancy(context))
+    return _score_run(run)
+
+class ObjectiveEvaluator:
+    """
+    Incremental calculate_objective_cost for neighbours of the committed
+    solution. Events ordered before the first event of any changed train
+    cannot depend on that train, so the replay resumes from the run's last
+    checkpoint before it. Results match a full replay exactly.
+
+    The run is updated in place: every evaluate() must be followed by
+    commit() or rollback(), which restores the truncated logs.
+    """
+    CHECKPOINT_COUNT = 32
+
+    def __init__(self, network_state):
+        self.network_state = network_state
+        self.run = None
+        self._undo = None
+
+    def reset(self, solution):
+        self.run, self._undo = _simulate(solution, self.network_state, checkpoint_interval=None), None
+        return self.run
+
+    def commit(self):
+        self._undo = None
+
+    def rollback(self):
+        if self._undo is None: return
+        run = self.run
+        (changed, arrival_undo, wait_delays, cost, checkpoint_len,
+         checkpoint_tail, checkpoint_key_tail, log_tails) = self._undo
+        for i, action, path_index in changed:
+            run.actions[i], run.path_indices[i] = action, path_index
+        for event, was_present in reversed(arrival_undo):
+            position = bisect_left(run.arrival_events, event)
+            if was_present: run.arrival_events.insert(position, event)
+            else: del run.arrival_events[position]
+        del run.checkpoints[checkpoint_len:], run.checkpoint_keys[checkpoint_len:]
+        run.checkpoints.extend(checkpoint_tail)
+        run.checkpoint_keys.extend(checkpoint_key_tail)
+        for log, (length, tail) in zip((run.timeline_log, run.conflict_log, run.processed_log, run.finish_log), log_tails):
+            del log[length:]
+            log.extend(tail)
+        run.wait_delays, run.cost = wait_delays, cost
+        self._undo = None
+
+    def evaluate(self, solution, changed=None):
+        """
+        Replays `solution` against the committed run. `changed` lists the
+        train indices whose decisions differ; None compares every train.
+        """
+        self.rollback()
+        run = self.run
+        if run is None or len(run.actions) != len(solution.actions):
+            return self.reset(solution)
+        if changed is None:
+            changed = [i for i in range(len(run.actions))
+                       if run.actions[i] != solution.actions[i] or run.path_indices[i] != solution.path_indices[i]]
+        if not changed:
+            return run
+
+        context = run.context
+        resume_key = min(context.arrival_event(i) for i in changed)
+        idx = bisect_right(run.checkpoint_keys, resume_key) - 1
+        if idx >= 0:
+            (event_count, in_flight, occupancy, wait_delays,
+             timeline_len, conflict_len, processed_len, finish_len) = run.checkpoints[idx]
+            next_key = run.checkpoint_keys[idx]
         else:
-            latest_clear_time = journey.actual_arrival_time
-            for other_tid, finish_time in actual_finish_times.items():
-                if TRAIN_PRECEDENCE.get(solution.train_journeys[other_tid].train_type, 0) >= TRAIN_PRECEDENCE.get(journey.train_type, 0):
-                    if finish_time > latest_clear_time: latest_clear_time = finish_time
-            held_delay = (latest_clear_time - journey.actual_arrival_time).total_seconds() / 60
-            individual_delays[tid] = max(0, held_delay)
-            total_delay += individual_delays[tid]
-    return total_delay - throughput_bonus, individual_delays, conflicts_detected, actual_timelines
-
-def generate_neighbor(solution):
-    neighbor = copy.deepcopy(solution)
-    if random.random() < 0.5:
-        reroutable = [tid for tid, d in neighbor.decisions.items() if d['action'] == 'PROCEED' and len(neighbor.train_journeys[tid].possible_paths) > 1]
-        if reroutable:
-            tid = random.choice(reroutable)
-            current_path = neighbor.decisions[tid]['path']
-            new_paths = [p for p in neighbor.train_journeys[tid].possible_paths if p != current_path]
-            if new_paths: neighbor.decisions[tid]['path'] = random.choice(new_paths)
+            event_count, in_flight, occupancy, wait_delays = 0, [], _initial_occupancy(context), None
+            timeline_len, conflict_len, processed_len, finish_len = 0, 0, 0, 0
+            next_key = None
+
+        changed_undo, arrival_undo = [], []
+        for i in set(changed):
+            changed_undo.append((i, run.actions[i], run.path_indices[i]))
+            if run.actions[i] == PROCEED:
+                event = context.arrival_event(i)
+                del run.arrival_events[bisect_left(run.arrival_events, event)]
+                arrival_undo.append((event, True))
+            run.actions[i], run.path_indices[i] = solution.actions[i], solution.path_indices[i]
+            if run.actions[i] == PROCEED:
+                event = context.arrival_event(i)
+                insort(run.arrival_events, event)
+                arrival_undo.append((event, False))
+        log_tails = []
+        for log, length in zip((run.timeline_log, run.conflict_log, run.processed_log, run.finish_log),
+                               (timeline_len, conflict_len, processed_len, finish_len)):
+            log_tails.append((length, log[length:]))
+            del log[length:]
+        checkpoint_len = max(idx, 0)
+        self._undo = (changed_undo, arrival_undo, run.wait_delays, run.cost, checkpoint_len,
+                      run.checkpoints[checkpoint_len:], run.checkpoint_keys[checkpoint_len:], log_tails)
+        del run.checkpoints[checkpoint_len:], run.checkpoint_keys[checkpoint_len:]
+
+        # No event of a changed train precedes the checkpoint, so the pending
+        # queue is the trains under way plus every arrival not yet processed.
+        start = bisect_left(run.arrival_events, next_key) if next_key is not None else 0
+        event_queue = in_flight + run.arrival_events[start:]
+        heapq.heapify(event_queue)
+        run.wait_delays = array('d', wait_delays) if wait_delays is not None else array('d', bytes(8 * len(run.actions)))
+        _replay(run, event_queue, [list(table) for table in occupancy], event_count)
+        return _score_run(run)
+
+def calculate_objective_cost(solution, network_state):
+    return _simulate(solution, network_state).results(solution)
+
+def apply_random_move(solution, rng=random):
+    """
+    Reroutes one proceeding train or toggles one train between HOLD and
+    PROCEED, in place. Returns the undo record (train index, old action,
+    old path index), or None if the drawn move changed nothing.
+    """
+    actions, path_indices, journeys = solution.actions, solution.path_indices, solution.journeys
+    if rng.random() < 0.5:
+        reroutable = [i for i in solution.reroutable if actions[i] == PROCEED]
+        if not reroutable: return None
+        i = rng.choice(reroutable)
+        record = (i, actions[i], path_indices[i])
+        path_indices[i] = rng.choice([k for k in range(len(journeys[i].possible_paths)) if k != path_indices[i]])
+        return record
+    if not actions: return None
+    i = rng.randrange(len(actions))
+    record = (i, actions[i], path_indices[i])
+    if actions[i] == PROCEED:
+        actions[i], path_indices[i] = HOLD, -1
+    elif journeys[i].possible_paths:
+        actions[i], path_indices[i] = PROCEED, journeys[i].default_path_index
     else:
-        tid = random.choice(list(neighbor.decisions.keys()))
-        if neighbor.decisions[tid]['action'] == 'PROCEED':
-            neighbor.decisions[tid]['action'] = 'HOLD'; neighbor.decisions[tid]['path'] = None
-        elif neighbor.train_journeys[tid].possible_paths:
-            neighbor.decisions[tid]['action'] = 'PROCEED'; neighbor.decisions[tid]['path'] = neighbor.train_journeys[tid].default_path
-    return neighbor
-
-def simulated_annealing(train_journeys, network_state, iterations=2000, temp=1000, cool_rate=0.99):
-    current_sol = PathBasedSolution(train_journeys)
-    current_cost, _, _, _ = calculate_objective_cost(current_sol, network_state)
-    best_sol, best_cost = current_sol, current_cost
-    for _ in range(iterations):
-        if temp <= 0.01: break
-        neighbor = generate_neighbor(current_sol)
-        neighbor_cost, _, _, _ = calculate_objective_cost(neighbor, network_state)
+        return None
+    return record
+
+def undo_move(solution, record):
+    i, action, path_index = record
+    solution.actions[i], solution.path_indices[i] = action, path_index
+
+class AnnealingSchedule:
+    """
+    Temperature schedule and stopping rules of one annealing search.
+
+    The fixed schedule cools by `cool_rate` per iteration. With a deadline
+    and adaptive=True it cools geometrically in elapsed time instead, from
+    `temp` down to MIN_TEMPERATURE at the deadline. Any deadline also stops
+    the fixed schedule, and `stagnation_window` stops a cooled search that
+    has not improved its best cost for that many iterations.
+    """
+    def __init__(self, iterations=2000, temp=1000, cool_rate=0.99, deadline=None, adaptive=False, stagnation_window=None):
+        self.iterations = iterations
+        self.temp = temp
+        self.cool_rate = cool_rate
+        self.started = time.monotonic()
+        self.deadline = deadline
+        self.adaptive = adaptive and deadline is not None
+        self.stagnation_window = stagnation_window
+
+    def temperature_at(self, now):
+        progress = (now - self.started) / max(self.deadline - self.started, 1e-9)
+        return self.temp * (MIN_TEMPERATURE / self.temp) ** min(progress, 1.0)
+
+    def progress(self, step, temp):
+        """Fraction of the search done after `step` iterations, by whichever limit is nearest."""
+        fractions = []
+        if self.temp > MIN_TEMPERATURE:
+            fractions.append(math.log(self.temp / max(temp, MIN_TEMPERATURE)) / math.log(self.temp / MIN_TEMPERATURE))
+        if self.iterations:
+            fractions.append(step / self.iterations)
+        if self.deadline is not None:
+            fractions.append((time.monotonic() - self.started) / max(self.deadline - self.started, 1e-9))
+        return min(max(fractions, default=0.0), 1.0)
+
+class SearchTelemetry:
+    """Counters of one annealing search, reported as `search` by execute_module."""
+    TRAJECTORY_LIMIT = 100
+    PROGRESS_INTERVAL = 100
+
+    def __init__(self):
+        self.iterations = self.accepted = 0
+        self.initial_temperature = None
+        self.stop_reason = None
+        self.best_cost_trajectory = []  # [iteration, best cost] at each improvement
+        self.warm_start = None  # {'reused', 'seeded', 'default', 'fallback'} of a warm-started search
+        self.windows = None  # {'count', 'fallback'} of a rolling-horizon search
+        self.progress = None  # optional callable, given the fraction done every PROGRESS_INTERVAL iterations
+
+    def record_best(self, iteration, cost):
+        self.best_cost_trajectory.append([iteration, cost])
+        if len(self.best_cost_trajectory) > 2 * self.TRAJECTORY_LIMIT:
+            # Thin out to every other point, always keeping the latest one.
+            self.best_cost_trajectory = self.best_cost_trajectory[::-2][::-1]
+
+    def as_dict(self):
+        return {
+            'iterations': self.iterations,
+            'accepted': self.accepted,
+            'acceptance_rate': round(self.accepted / self.iterations, 4) if self.iterations else 0.0,
+            'initial_temperature': round(self.initial_temperature, 2) if self.initial_temperature else None,
+            'stop_reason': self.stop_reason,
+            'best_cost_trajectory': [[iteration, round(cost, 2)] for iteration, cost in self.best_cost_trajectory],
+            'warm_start': self.warm_start,
+            'windows': self.windows,
+        }
+
+def calibrate_temperature(solution, evaluator, rng, samples=50, acceptance=0.8, deadline=None):
+    """
+    Initial temperature at which the average uphill move from `solution` is
+    accepted with probability `acceptance`, estimated from sampled moves.
+    Returns None if no sampled move was uphill.
+    """
+    base_cost = evaluator.run.cost
+    uphill = []
+    for _ in range(samples):
+        if deadline is not None and time.monotonic() >= deadline: break
+        move = apply_random_move(solution, rng)
+        cost = evaluator.evaluate(solution, [move[0]] if move else ()).cost
+        evaluator.rollback()
+        if move: undo_move(solution, move)
+        if cost > base_cost: uphill.append(cost - base_cost)
+    return -(sum(uphill) / len(uphill)) / math.log(acceptance) if uphill else None
+
+def _anneal(solution, evaluator, rng, schedule, temp, iterations, telemetry):
+    """
+    Runs up to `iterations` annealing steps (None: until the schedule stops)
+    on `solution` in place, which ends as the chain's current solution;
+    `evaluator` must hold its committed run. Returns (best solution,
+    best cost, final temperature) and updates `telemetry`.
+    """
+    current_cost = evaluator.run.cost
+    best_sol, best_cost = solution.copy(), current_cost
+    step = since_improvement = 0
+    telemetry.stop_reason = 'iterations'
+    while iterations is None or step < iterations:
+        if schedule.deadline is not None:
+            now = time.monotonic()
+            if now >= schedule.deadline: telemetry.stop_reason = 'deadline'; break
+            if schedule.adaptive: temp = schedule.temperature_at(now)
+        if temp <= MIN_TEMPERATURE: telemetry.stop_reason = 'temperature'; break
+        if temp > schedule.temp * STAGNATION_TEMPERATURE_SHARE:
+            since_improvement = 0  # a hot chain wanders; only a cooled one can stagnate
+        elif schedule.stagnation_window and since_improvement >= schedule.stagnation_window:
+            telemetry.stop_reason = 'stagnation'; break
+        step += 1
+        since_improvement += 1
+        if telemetry.progress and step % telemetry.PROGRESS_INTERVAL == 0:
+            telemetry.progress(schedule.progress(telemetry.iterations + step, temp))
+        move = apply_random_move(solution, rng)
+        neighbor_cost = evaluator.evaluate(solution, [move[0]] if move else ()).cost
         delta = neighbor_cost - current_cost
-        if delta < 0 or random.random() < math.exp(-delta / temp):
-            current_sol, current_cost = neighbor, neighbor_cost
-            if current_cost < best_cost: best_sol, best_cost = copy.deepcopy(current_sol), current_cost
-        temp *= cool_rate
+        if delta < 0 or rng.random() < math.exp(-delta / temp):
+            evaluator.commit()
+            telemetry.accepted += 1
+            current_cost = neighbor_cost
+            if current_cost < best_cost:
+                best_sol.load(solution); best_cost = current_cost
+                since_improvement = 0
+                telemetry.record_best(telemetry.iterations + step, best_cost)
+        else:
+            evaluator.rollback()
+            if move: undo_move(solution, move)
+        if not schedule.adaptive: temp *= schedule.cool_rate
+    telemetry.iterations += step
+    return best_sol, best_cost, temp
+
+def greedy_dispatch(train_journeys, network_state, boundary=None):
+    """
+    Constructive solution in one pass, without search. Trains are
+    dispatched in arrival order, higher precedence first among trains
+    arriving together, over the same track and junction occupancy as the
+    replay: each candidate path is walked edge by edge after the trains
+    already dispatched, and the path with the earliest exit wins (the
+    default path on ties). A train is only held when waiting for that exit
+    would cost more than its throughput bonus.
+    """
+    solution = _bounded_solution(train_journeys, network_state, boundary)
+    if not solution.journeys:
+        return solution
+    context = _simulation_context(solution, network_state)
+    edge_start, edge_end = context.network.edge_start, context.network.edge_end
+    track_exit, _, node_exit, _ = _initial_occupancy(context)
+    order = sorted(range(len(solution.journeys)), key=lambda i: (context.arrivals[i], -context.levels[i], context.ranks[i]))
+    for i in order:
+        if solution.actions[i] == HOLD:
+            continue  # no candidate path
+        durations, arrival = context.durations[i], context.arrivals[i]
+        best = None
+        for path_index, edges in enumerate(context.path_edges[i]):
+            current_time = arrival
+            wait_time = 0
+            for edge in edges:
+                entry_time = max(current_time, track_exit[edge], node_exit[edge_start[edge]])
+                wait_time += entry_time - current_time
+                current_time = entry_time + durations[edge]
+            if best is None or current_time < best[0] or (current_time == best[0] and path_index == solution.path_indices[i]):
+                best = (current_time, path_index, wait_time)
+        _, path_index, wait_time = best
+        if wait_time / 1000000 / 60 > THROUGHPUT_BONUS:
+            solution.actions[i], solution.path_indices[i] = HOLD, -1
+            continue
+        solution.path_indices[i] = path_index
+        current_time = arrival
+        for edge in context.path_edges[i][path_index]:
+            current_time = max(current_time, track_exit[edge], node_exit[edge_start[edge]]) + durations[edge]
+            track_exit[edge] = node_exit[edge_end[edge]] = current_time
+    return solution
+
+def _bounded_solution(train_journeys, network_state, boundary):
+    """The all-default solution, its replays starting from `boundary` if given (see SimulationContext)."""
+    solution = PathBasedSolution(train_journeys)
+    if boundary is not None:
+        solution.simulation_context = SimulationContext(solution, network_state, boundary)
+    return solution
+
+def initial_solution(train_journeys, network_state, boundary=None):
+    """The greedy_dispatch solution, or the all-default one if that is cheaper."""
+    default = _bounded_solution(train_journeys, network_state, boundary)
+    greedy = greedy_dispatch(train_journeys, network_state, boundary)
+    if _simulate(greedy, network_state).cost < _simulate(default, network_state).cost:
+        return greedy
+    return default
+
+def simulated_annealing(train_journeys, network_state, iterations=2000, temp=1000, cool_rate=0.99, rng=random,
+                        deadline=None, adaptive=False, stagnation_window=None, telemetry=None, boundary=None,
+                        start=None):
+    """
+    Single annealing chain from initial_solution, or from `start`, an
+    (actions, path_indices) pair, if given. With adaptive=True and a
+    deadline the initial temperature is calibrated from sampled moves and
+    the search runs until the deadline or stagnation. A boundary starts
+    every replay from the exit times it carries (see SimulationContext).
+    """
+    telemetry = telemetry or SearchTelemetry()
+    if start is None:
+        current_sol = initial_solution(train_journeys, network_state, boundary)
+    else:
+        current_sol = _bounded_solution(train_journeys, network_state, boundary)
+        current_sol.actions[:], current_sol.path_indices[:] = start
+    evaluator = ObjectiveEvaluator(network_state)
+    evaluator.reset(current_sol)
+    schedule = AnnealingSchedule(iterations, temp, cool_rate, deadline, adaptive, stagnation_window)
+    if schedule.adaptive:
+        schedule.temp = calibrate_temperature(current_sol, evaluator, rng, deadline=deadline) or temp
+        schedule.iterations = None
+        schedule.stagnation_window = stagnation_window or DEFAULT_STAGNATION_WINDOW
+    telemetry.initial_temperature = schedule.temp
+    telemetry.record_best(0, evaluator.run.cost)
+    best_sol, _, _ = _anneal(current_sol, evaluator, rng, schedule, schedule.temp, schedule.iterations, telemetry)
+    return best_sol
+
+def warm_start_solution(train_journeys, previous_decisions):
+    """
+    Solution carrying over each surviving train's decision from
+    `previous_decisions` ({train_id: {'action', 'path'}}, e.g. a previous
+    response's recommendations). Trains that are new, or set to proceed on
+    a path that is no longer a candidate (e.g. after a closure), keep the
+    default decisions. Returns (solution, indices of those trains); trains
+    without candidate paths have nothing to decide and are in neither.
+    """
+    solution = PathBasedSolution(train_journeys)
+    seeded = []
+    for i, tid in enumerate(solution.train_ids):
+        possible_paths = solution.journeys[i].possible_paths
+        if not possible_paths:
+            continue
+        previous = previous_decisions.get(tid)
+        if previous is None:
+            seeded.append(i)
+            continue
+        path_index = possible_paths.index(previous['path']) if previous.get('path') in possible_paths else -1
+        if previous.get('action') == 'HOLD':
+            solution.actions[i], solution.path_indices[i] = HOLD, -1
+        elif path_index >= 0:
+            solution.path_indices[i] = path_index
+        else:
+            seeded.append(i)
+    return solution, seeded
+
+def _seed_trains(solution, evaluator, indices):
+    """Greedily gives each train in `indices` its cheapest decision given all the others."""
+    for i in indices:
+        candidates = [(PROCEED, path_index) for path_index in range(len(solution.journeys[i].possible_paths))]
+        candidates.append((HOLD, -1))
+        best = (evaluator.run.cost, solution.actions[i], solution.path_indices[i])
+        for action, path_index in candidates:
+            if (action, path_index) == best[1:]: continue
+            solution.actions[i], solution.path_indices[i] = action, path_index
+            cost = evaluator.evaluate(solution, [i]).cost
+            evaluator.rollback()
+            if cost < best[0]: best = (cost, action, path_index)
+        solution.actions[i], solution.path_indices[i] = best[1], best[2]
+        evaluator.evaluate(solution, [i])
+        evaluator.commit()
+
+def warm_start_annealing(train_journeys, network_state, previous_decisions, rng=random, iterations=WARM_START_ITERATIONS,
+                         deadline=None, adaptive=False, stagnation_window=None, telemetry=None):
+    """
+    Re-optimizes after a small change to the train set. Starts from the
+    previous decisions (see warm_start_solution), greedily seeds up to
+    WARM_START_MAX_SEEDED new or affected trains, and falls back to the
+    all-default solution if that is cheaper. A short reheat-and-cool phase
+    then starts from a temperature that accepts WARM_START_ACCEPTANCE of
+    uphill moves and reaches MIN_TEMPERATURE after `iterations`.
+    """
+    telemetry = telemetry or SearchTelemetry()
+    current_sol, undecided = warm_start_solution(train_journeys, previous_decisions)
+    evaluator = ObjectiveEvaluator(network_state)
+    evaluator.reset(current_sol)
+    seeded = undecided[:WARM_START_MAX_SEEDED]
+    _seed_trains(current_sol, evaluator, seeded)
+    cold_sol = PathBasedSolution(train_journeys)
+    fallback = _simulate(cold_sol, network_state).cost < evaluator.run.cost
+    if fallback:
+        current_sol.load(cold_sol)
+        evaluator.reset(current_sol)
+    decided = sum(1 for journey in current_sol.journeys if journey.possible_paths)
+    telemetry.warm_start = {'reused': decided - len(undecided), 'seeded': len(seeded),
+                            'default': len(undecided) - len(seeded), 'fallback': fallback}
+
+    temp = calibrate_temperature(current_sol, evaluator, rng, samples=WARM_START_SAMPLES,
+                                 acceptance=WARM_START_ACCEPTANCE, deadline=deadline) or 1.0
+    cool_rate = (MIN_TEMPERATURE / temp) ** (1 / iterations) if temp > MIN_TEMPERATURE else 1.0
+    schedule = AnnealingSchedule(iterations, temp, cool_rate, deadline, adaptive, stagnation_window)
+    if schedule.adaptive:
+        schedule.iterations = None
+        schedule.stagnation_window = stagnation_window or DEFAULT_STAGNATION_WINDOW
+    telemetry.initial_temperature = schedule.temp
+    telemetry.record_best(0, evaluator.run.cost)
+    best_sol, _, _ = _anneal(current_sol, evaluator, rng, schedule, schedule.temp, schedule.iterations, telemetry)
     return best_sol
 
 # ==============================================================================
-# 4. MAIN EXECUTION & REPORTING
+# 4. PARALLEL MULTI-START SEARCH
 # ==============================================================================
-def execute_module(train_data, non_functional_segments=None):
+# Journeys of the request being solved, built once per pool worker.
+_worker_problem = None
+
+def _init_chain_worker(train_data, non_functional_segments):
+    global _worker_problem
+    network_state = NetworkTimeState()
+    _worker_problem = (network_state, build_train_journeys(train_data, non_functional_segments, network_state))
+
+def _chain_progress(progress, chain, chain_count):
+    """Scales a sequentially run chain's progress into the share of its block."""
+    if progress is None:
+        return None
+    return lambda fraction: progress((chain + fraction) / chain_count)
+
+def _run_chain_epoch(rng_state, decisions, iterations, temp, schedule, problem=None, progress=None):
     """
-    Main entry point for the OR module. It now safely handles and sanitizes
-    the input data before running the optimization.
+    Continues one chain for up to `iterations` steps (None: until the
+    schedule stops it) from `decisions`, an (actions, path_indices) pair.
+    Returns the new RNG state, current and best decisions, best cost,
+    temperature and the epoch's SearchTelemetry.
     """
-    network_state = NetworkTimeState()
-    train_journeys = []
+    network_state, train_journeys = problem or _worker_problem
+    solution = PathBasedSolution(train_journeys)
+    solution.actions[:], solution.path_indices[:] = decisions
+    rng = random.Random()
+    rng.setstate(rng_state)
+    evaluator = ObjectiveEvaluator(network_state)
+    evaluator.reset(solution)
+    telemetry = SearchTelemetry()
+    telemetry.progress = progress
+    best_sol, best_cost, temp = _anneal(solution, evaluator, rng, schedule, temp, iterations, telemetry)
+    return (rng.getstate(), (solution.actions, solution.path_indices),
+            (best_sol.actions, best_sol.path_indices), best_cost, temp, telemetry)
 
+def _process_pool(workers, task_count, initializer, initargs, min_workers=2):
+    """
+    ProcessPoolExecutor for up to `task_count` parallel tasks, or None to
+    run them in-process when that leaves fewer than `min_workers` workers.
+    """
+    workers = min(workers or os.cpu_count() or 1, task_count)
+    if workers < min_workers:
+        return None
+    # Imported here: multiprocessing is slow to import and most requests run in-process.
+    from concurrent.futures import ProcessPoolExecutor
+    try:
+        return ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+    except (OSError, NotImplementedError) as e:
+        # e.g. AWS Lambda based runtimes have no /dev/shm for the pool's semaphores.
+        print(f"WARNING: Process pool unavailable, running tasks sequentially. Reason: {e}")
+        return None
+
+def _chain_executor(workers, restarts, train_data, non_functional_segments):
+    return _process_pool(workers, restarts, _init_chain_worker, (train_data, non_functional_segments))
+
+def multi_start_annealing(train_data, non_functional_segments, train_journeys, network_state, restarts=4, seed=None,
+                          workers=None, exchange_interval=None, iterations=2000, temp=1000, cool_rate=0.99,
+                          deadline=None, adaptive=False, stagnation_window=None, telemetry=None):
+    """
+    Runs `restarts` independently seeded annealing chains from
+    initial_solution, across a process pool when more than one worker is
+    available, and returns the best solution. With an exchange_interval every chain continues from the best
+    solution found so far after each block of that many iterations.
+
+    Chain seeds are drawn from `seed`, and ties go to the lowest chain, so
+    for a given seed the result does not depend on worker count. A deadline
+    makes the result depend on machine speed as well; see AnnealingSchedule.
+    """
+    telemetry = telemetry or SearchTelemetry()
+    master_rng = random.Random(seed)
+    rng_states = [random.Random(master_rng.getrandbits(64)).getstate() for _ in range(restarts)]
+    start = initial_solution(train_journeys, network_state)
+    schedule = AnnealingSchedule(iterations, temp, cool_rate, deadline, adaptive, stagnation_window)
+    if schedule.adaptive:
+        evaluator = ObjectiveEvaluator(network_state)
+        evaluator.reset(start)
+        calibration_rng = random.Random(master_rng.getrandbits(64))
+        schedule.temp = calibrate_temperature(start, evaluator, calibration_rng, deadline=deadline) or temp
+        schedule.iterations = None
+        schedule.stagnation_window = stagnation_window or DEFAULT_STAGNATION_WINDOW
+    telemetry.initial_temperature = schedule.temp
+    chains = [(start.actions, start.path_indices)] * restarts
+    temps = [schedule.temp] * restarts
+    active = [True] * restarts
+    best_cost, best_decisions = None, chains[0]
+    block = exchange_interval or schedule.iterations
+    executor = _chain_executor(workers, restarts, train_data, non_functional_segments)
+    try:
+        remaining = schedule.iterations
+        while (remaining is None or remaining > 0) and any(active):
+            steps = block if remaining is None else min(block, remaining)
+            running = [i for i in range(restarts) if active[i]]
+            args = [(rng_states[i], chains[i], steps, temps[i], schedule) for i in running]
+            if executor:
+                futures = [executor.submit(_run_chain_epoch, *chain_args) for chain_args in args]
+                results = [future.result() for future in futures]
+            else:
+                results = [_run_chain_epoch(*chain_args, problem=(network_state, train_journeys),
+                                            progress=_chain_progress(telemetry.progress, k, len(args)))
+                           for k, chain_args in enumerate(args)]
+            for i, (rng_state, current, chain_best, chain_best_cost, chain_temp, chain_telemetry) in zip(running, results):
+                rng_states[i], chains[i], temps[i] = rng_state, current, chain_temp
+                telemetry.iterations += chain_telemetry.iterations
+                telemetry.accepted += chain_telemetry.accepted
+                if chain_telemetry.stop_reason != 'iterations':
+                    active[i] = False
+                    telemetry.stop_reason = chain_telemetry.stop_reason
+                if best_cost is None or chain_best_cost < best_cost:
+                    best_cost, best_decisions = chain_best_cost, chain_best
+                    telemetry.record_best(telemetry.iterations, best_cost)
+            if exchange_interval:
+                chains = [best_decisions] * restarts
+            if remaining is not None:
+                remaining -= steps
+            if telemetry.progress:
+                telemetry.progress(schedule.progress(schedule.iterations - remaining if remaining is not None else 0,
+                                                     min(temps)))
+        if any(active): telemetry.stop_reason = 'iterations'
+    finally:
+        if executor: executor.shutdown()
+    start.actions[:], start.path_indices[:] = best_decisions
+    return start
+
+def _horizon_windows(context, horizon_minutes, overlap_minutes):
+    """
+    Splits the trains of a context into consecutive windows of arrival
+    time. Returns [(committed, look_ahead)]: the indices of the trains
+    arriving within `horizon_minutes` of the window's start and of those
+    arriving in the `overlap_minutes` after that. Windows without trains
+    are skipped.
+    """
+    horizon = timedelta(minutes=horizon_minutes) // MICROSECOND
+    overlap = timedelta(minutes=overlap_minutes) // MICROSECOND
+    order = sorted(range(len(context.arrivals)), key=context.arrivals.__getitem__)
+    arrivals = [context.arrivals[i] for i in order]
+    windows, first = [], 0
+    while first < len(order):
+        start = arrivals[first] // horizon * horizon
+        end = bisect_left(arrivals, start + horizon, first)
+        look_ahead_end = bisect_left(arrivals, start + horizon + overlap, end)
+        windows.append((sorted(order[first:end]), sorted(order[end:look_ahead_end])))
+        first = end
+    return windows
+
+def _window_start(train_journeys, indices, network_state, boundary):
+    """initial_solution's decisions for the trains in `indices`, its replays starting from `boundary`."""
+    solution = initial_solution([train_journeys[i] for i in indices], network_state, boundary)
+    return solution.actions, solution.path_indices
+
+def _carry_boundary(train_journeys, committed, decisions, network_state, boundary):
+    """
+    Boundary left for the next window by a window's `committed` trains:
+    their `decisions` replayed from `boundary`, which gives the track and
+    node exit times they leave behind and, on top of the boundary's, the
+    latest finish per precedence level.
+    """
+    solution = _bounded_solution([train_journeys[i] for i in committed], network_state, boundary)
+    solution.actions[:], solution.path_indices[:] = decisions
+    context = _simulation_context(solution, network_state)
+    run = SimulationRun(solution, context)
+    run.arrival_events = sorted(context.arrival_event(i) for i, action in enumerate(run.actions) if action == PROCEED)
+    occupancy = _initial_occupancy(context)
+    _replay(run, list(run.arrival_events), occupancy)
+    return context.epoch, occupancy[0], occupancy[2], _latest_finish_by_level(context, run.finish_log)
+
+def _optimize_window(indices, committed, boundary, start, rng_state, budget_seconds, problem=None):
+    """
+    Seeded single-chain search of one rolling-horizon window over the
+    trains in `indices`, from the `start` decisions and its replays
+    starting from `boundary`, stopped `budget_seconds` after it starts
+    (None: no limit). Returns the actions and path indices of the
+    committed trains, and the search's SearchTelemetry.
+    """
+    deadline = time.monotonic() + budget_seconds if budget_seconds is not None else None
+    network_state, train_journeys = problem or _worker_problem
+    rng = random.Random()
+    rng.setstate(rng_state)
+    telemetry = SearchTelemetry()
+    solution = simulated_annealing([train_journeys[i] for i in indices], network_state, rng=rng, deadline=deadline,
+                                   telemetry=telemetry, boundary=boundary, start=start)
+    positions = {index: position for position, index in enumerate(indices)}
+    return (array('b', (solution.actions[positions[i]] for i in committed)),
+            array('i', (solution.path_indices[positions[i]] for i in committed)), telemetry)
+
+def rolling_horizon_annealing(train_data, non_functional_segments, train_journeys, network_state, horizon_minutes,
+                              overlap_minutes=HORIZON_OVERLAP_MINUTES, seed=None, workers=None, deadline=None,
+                              telemetry=None):
+    """
+    Rolling-horizon search for day-scale timetables. Trains are split into
+    windows of `horizon_minutes` by actual arrival time (see
+    _horizon_windows), and each window runs its own seeded annealing chain
+    over its trains and the look-ahead after it, but only keeps the
+    decisions of its own trains. The windows are solved in order: a
+    window's replays start from the track and node exit times left by the
+    decisions committed in the windows before it (see _carry_boundary),
+    and each window gets an equal share of the time left until `deadline`.
+
+    A boundary also carries the latest finish per precedence level of the
+    committed trains, which trains held in later windows wait for.
+
+    A window's search starts from the greedy decisions for the boundary its
+    predecessor's starting decisions leave, so they can be prepared before
+    the predecessor's search ends. With more than one worker a window
+    therefore searches in a worker process while this one prepares the
+    next window's starting decisions. Results do not depend on the worker
+    count.
+
+    The stitched solution is replayed once over all trains, and
+    greedy_dispatch's solution is returned instead if that is cheaper.
+    """
+    telemetry = telemetry or SearchTelemetry()
+    solution = PathBasedSolution(train_journeys)
+    if not solution.journeys:
+        return solution
+    context = _simulation_context(solution, network_state)
+    windows = _horizon_windows(context, horizon_minutes, overlap_minutes)
+    track_exit, _, node_exit, _ = _empty_occupancy(context)
+    boundary = (context.epoch, track_exit, node_exit, {})
+    master_rng = random.Random(seed)
+    rng_states = [random.Random(master_rng.getrandbits(64)).getstate() for _ in windows]
+    windows = [(sorted(committed + look_ahead), committed) for committed, look_ahead in windows]
+    start = _window_start(train_journeys, windows[0][0], network_state, boundary)
+    telemetry.stop_reason = 'iterations'
+    # Windows run one at a time, so one worker is enough to overlap them with the preparation here.
+    executor = None
+    if (workers or os.cpu_count() or 1) > 1:
+        executor = _process_pool(1, 1, _init_chain_worker, (train_data, non_functional_segments), min_workers=1)
+    problem = (network_state, train_journeys)
+    try:
+        for k, (indices, committed) in enumerate(windows):
+            budget_seconds = max(0.0, (deadline - time.monotonic()) / (len(windows) - k)) if deadline is not None else None
+            task = (indices, committed, boundary, start, rng_states[k], budget_seconds)
+            future = executor.submit(_optimize_window, *task) if executor else None
+            if k + 1 < len(windows):
+                # The next window starts from its greedy decisions after this window's starting ones.
+                positions = {index: position for position, index in enumerate(indices)}
+                start_decisions = (array('b', (start[0][positions[i]] for i in committed)),
+                                   array('i', (start[1][positions[i]] for i in committed)))
+                forecast = _carry_boundary(train_journeys, committed, start_decisions, network_state, boundary)
+                start = _window_start(train_journeys, windows[k + 1][0], network_state, forecast)
+            actions, path_indices, window_telemetry = future.result() if future else _optimize_window(*task, problem=problem)
+            for i, action, path_index in zip(committed, actions, path_indices):
+                solution.actions[i], solution.path_indices[i] = action, path_index
+            telemetry.iterations += window_telemetry.iterations
+            telemetry.accepted += window_telemetry.accepted
+            if window_telemetry.stop_reason != 'iterations':
+                telemetry.stop_reason = window_telemetry.stop_reason
+            if telemetry.progress:
+                telemetry.progress((k + 1) / len(windows))
+            if k + 1 < len(windows):
+                boundary = _carry_boundary(train_journeys, committed, (actions, path_indices), network_state, boundary)
+    finally:
+        if executor: executor.shutdown()
+    greedy = greedy_dispatch(train_journeys, network_state)
+    fallback = _simulate(greedy, network_state).cost < _simulate(solution, network_state).cost
+    telemetry.windows = {'count': len(windows), 'fallback': fallback}
+    return greedy if fallback else solution
+
+# Parsed trains of the batch being evaluated, shared by every scenario a
+# pool worker runs.
+_scenario_worker = None
+
+def _init_scenario_worker(parsed_trains):
+    global _scenario_worker
+    _scenario_worker = (NetworkTimeState(), parsed_trains)
+
+def _evaluate_scenario(non_functional_segments, seed, budget_seconds, problem=None):
+    """
+    Seeded single-chain search of one closure set, stopped `budget_seconds`
+    after the scenario starts (None: no limit); returns its delays and summary.
+    """
+    deadline = time.monotonic() + budget_seconds if budget_seconds is not None else None
+    network_state, parsed_trains = problem or _scenario_worker
+    train_journeys = journeys_from_parsed(parsed_trains, non_functional_segments, network_state)
+    telemetry = SearchTelemetry()
+    best_solution = simulated_annealing(train_journeys, network_state, rng=random.Random(seed), deadline=deadline,
+                                        telemetry=telemetry)
+    _, final_delays, conflicts, _ = calculate_objective_cost(best_solution, network_state)
+    return {
+        'score': round(sum(final_delays.values()), 2),
+        'conflict_count': len(conflicts),
+        'unroutable_trains': sum(1 for journey in train_journeys if not journey.possible_paths),
+        'train_delays': {tid: round(delay, 2) for tid, delay in final_delays.items()},
+        'stop_reason': telemetry.stop_reason,
+    }
+
+def evaluate_closure_scenarios(train_data, scenarios, seed=0, workers=None, time_limit_ms=None):
+    """
+    What-if comparison of closure sets for one train set. `scenarios` is a
+    list of (name, non_functional_segments). Trains are parsed once and
+    sent once to each pool worker, which memoizes path catalogs across the
+    scenarios it runs. Every scenario, and the closure-free baseline, runs
+    the same seeded search, so differences come from the closures rather
+    than the random stream.
+
+    The tasks run in rounds of one scenario per worker, and each scenario
+    gets an equal share of `time_limit_ms` per round, counted from its own
+    start, so scenarios queued behind others are not left without time.
+
+    Returns (baseline, scenario results ranked by score, worst first).
+    """
+    parsed_trains = parse_train_data(train_data)
+    tasks = [('baseline', [])] + list(scenarios)
+    executor = _process_pool(workers, len(tasks), _init_scenario_worker, (parsed_trains,))
+    budget_seconds = None
+    if time_limit_ms is not None:
+        pool_size = min(workers or os.cpu_count() or 1, len(tasks)) if executor else 1
+        rounds = math.ceil(len(tasks) / pool_size)
+        budget_seconds = time_limit_ms / 1000 * SEARCH_BUDGET_SHARE / rounds
+    try:
+        if executor:
+            futures = [executor.submit(_evaluate_scenario, closures, seed, budget_seconds) for _, closures in tasks]
+            outcomes = [future.result() for future in futures]
+        else:
+            problem = (NetworkTimeState(), parsed_trains)
+            outcomes = [_evaluate_scenario(closures, seed, budget_seconds, problem=problem) for _, closures in tasks]
+    finally:
+        if executor: executor.shutdown()
+
+    baseline = dict(outcomes[0], name='baseline', non_functional_segments=[])
+    results = []
+    for (name, closures), outcome in zip(tasks[1:], outcomes[1:]):
+        changes = {tid: round(delay - baseline['train_delays'][tid], 2) for tid, delay in outcome['train_delays'].items()}
+        outcome.update(
+            name=name,
+            non_functional_segments=[list(segment) for segment in closures],
+            score_delta=round(outcome['score'] - baseline['score'], 2),
+            delay_changes={tid: change for tid, change in changes.items() if change},
+        )
+        results.append(outcome)
+    # Stable sort: equal scores keep the request's order.
+    results.sort(key=lambda outcome: -outcome['score'])
+    for rank, outcome in enumerate(results, 1):
+        outcome['rank'] = rank
+    return baseline, results
+
+# ==============================================================================
+# 5. MAIN EXECUTION & REPORTING
+# ==============================================================================
+def parse_train_data(train_data):
+    """
+    Sanitizes the `trains` payload into TrainJourney keyword arguments,
+    raising ValueError for malformed entries.
+    """
+    parsed_trains = []
     for tid, info in train_data.items():
         try:
             # --- Robust Data Sanitization ---
@@ -195,7 +1410,7 @@ def execute_module(train_data, non_functional_segments=None):
             delay_factors_data = info.get('delay_factors')
             delay_factors_obj = DelayFactors(**delay_factors_data) if isinstance(delay_factors_data, dict) else DelayFactors()
 
-            train_journeys.append(TrainJourney(
+            parsed_trains.append(dict(
                 train_id=tid,
                 entry_node=info['entry_node'],
                 exit_node=info['exit_node'],
@@ -203,16 +1418,93 @@ def execute_module(train_data, non_functional_segments=None):
                 scheduled_exit_time=exit_time_obj,
                 train_type=info['type'],
                 delay_factors=delay_factors_obj,
-                network_state=network_state,
-                non_functional_segments=non_functional_segments
             ))
         except (KeyError, TypeError, ValueError) as e:
             print(f"CRITICAL ERROR: Malformed data for train {tid}. Reason: {e}")
             raise ValueError(f"Malformed data for train {tid}")
+    return parsed_trains
+
+def journeys_from_parsed(parsed_trains, non_functional_segments, network_state):
+    """TrainJourney objects for parse_train_data output under one closure set."""
+    path_catalog = get_path_catalog(network_state, non_functional_segments)
+    return [TrainJourney(network_state=network_state, non_functional_segments=non_functional_segments,
+                         path_catalog=path_catalog, **train) for train in parsed_trains]
+
+def build_train_journeys(train_data, non_functional_segments, network_state):
+    """
+    Sanitizes the `trains` payload into TrainJourney objects, raising
+    ValueError for malformed entries.
+    """
+    return journeys_from_parsed(parse_train_data(train_data), non_functional_segments, network_state)
 
-    best_solution = simulated_annealing(train_journeys, network_state)
-    _, final_delays, conflicts, final_timelines = calculate_objective_cost(best_solution, network_state)
+def _warm_start_overlap(train_journeys, previous_decisions):
+    return sum(journey.train_id in previous_decisions for journey in train_journeys) / max(len(train_journeys), 1)
+
+def execute_module(train_data, non_functional_segments=None, restarts=1, seed=None, workers=None, exchange_interval=None,
+                   time_budget_ms=None, time_limit_ms=None, warm_start=None, progress=None, timer=None, mode='anneal',
+                   horizon_minutes=None):
+    """
+    Main entry point for the OR module. It now safely handles and sanitizes
+    the input data before running the optimization.
+
+    restarts > 1 or a seed switches to multi_start_annealing: that many
+    seeded chains over up to `workers` processes, exchanging their best
+    solution every `exchange_interval` iterations if given.
+
+    time_budget_ms switches to the adaptive schedule, which searches for
+    most of that wall-clock budget; time_limit_ms only caps the fixed
+    schedule. Both count from the call, including input sanitization.
+
+    warm_start holds the decisions of a previous run ({train_id: {'action',
+    'path'}}, e.g. its recommendations). A single-chain search re-optimizes
+    from them with warm_start_annealing when enough trains carry over.
+    progress, if given, is called with the fraction of the search done.
+    timer, if given, times the parse, journeys, search, objective and
+    report stages.
+
+    mode='greedy' skips the search and returns greedy_dispatch's solution;
+    the other search options are then ignored.
+
+    horizon_minutes switches to rolling_horizon_annealing with windows of
+    that length, seeded by `seed`, searching in a worker process if
+    `workers` allows more than one; restarts,
+    warm_start and the adaptive schedule do not apply, and a time budget
+    is shared equally by the windows.
+    """
+    started = time.monotonic()
+    network_state = NetworkTimeState()
+    with _stage(timer, 'parse'):
+        parsed_trains = parse_train_data(train_data)
+    with _stage(timer, 'journeys'):
+        train_journeys = journeys_from_parsed(parsed_trains, non_functional_segments, network_state)
+
+    budget_ms = time_budget_ms if time_budget_ms is not None else time_limit_ms
+    deadline = None
+    if budget_ms is not None:
+        deadline = started + budget_ms / 1000 * SEARCH_BUDGET_SHARE
+    search_options = dict(deadline=deadline, adaptive=time_budget_ms is not None, telemetry=SearchTelemetry())
+    search_options['telemetry'].progress = progress
+    with _stage(timer, 'search'):
+        if mode == 'greedy':
+            best_solution = greedy_dispatch(train_journeys, network_state)
+            search_options['telemetry'].stop_reason = 'greedy'
+        elif horizon_minutes:
+            best_solution = rolling_horizon_annealing(train_data, non_functional_segments, train_journeys, network_state,
+                                                      horizon_minutes, seed=seed, workers=workers, deadline=deadline,
+                                                      telemetry=search_options['telemetry'])
+        elif warm_start and restarts == 1 and _warm_start_overlap(train_journeys, warm_start) >= WARM_START_MIN_OVERLAP:
+            rng = random.Random(seed) if seed is not None else random
+            best_solution = warm_start_annealing(train_journeys, network_state, warm_start, rng=rng, **search_options)
+        elif restarts > 1 or seed is not None:
+            best_solution = multi_start_annealing(train_data, non_functional_segments, train_journeys, network_state,
+                                                  restarts=restarts, seed=seed, workers=workers,
+                                                  exchange_interval=exchange_interval, **search_options)
+        else:
+            best_solution = simulated_annealing(train_journeys, network_state, **search_options)
+    with _stage(timer, 'objective'):
+        _, final_delays, conflicts, final_timelines = calculate_objective_cost(best_solution, network_state)
     final_score = sum(final_delays.values())
+    report_started = time.perf_counter()
     
     # *** FIX: Convert tuple keys to strings for JSON serialization ***
     json_safe_timelines = {}
@@ -237,11 +1529,14 @@ def execute_module(train_data, non_functional_segments=None):
             'path': data['path'], 
             'total_delay_minutes': round(final_delays.get(tid, 0), 2)
         })
+    if timer is not None:
+        timer.add('report', time.perf_counter() - report_started)
         
     return {
         'score': round(final_score, 2), 
         'recommendations': recommendations, 
         'solution': best_solution, 
         'conflicts': conflicts, 
-        'timelines': json_safe_timelines  # Use the converted version
+        'timelines': json_safe_timelines,  # Use the converted version
+        'search': dict(search_options['telemetry'].as_dict(), elapsed_ms=round((time.monotonic() - started) * 1000, 1))
     }
\ No newline at end of file
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from dashboard_data_manager import get_redis_client
+from or_module import execute_module, normalize_segments
+
+# How long a cached /optimize result is served, in both cache layers.
+RESULT_CACHE_TTL_SECONDS = int(os.environ.get('RESULT_CACHE_TTL_SECONDS', '300'))
+
+# Results kept in each worker's in-process layer; least recently used go first.
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', '64'))
+
+# Shared layer: one key per result, plus a hash of hit/miss counters summed
+# over all workers.
+REDIS_RESULT_KEY_PREFIX = "optimize_result"
+REDIS_RESULT_STATS_KEY = f"{REDIS_RESULT_KEY_PREFIX}:stats"
+
+# Options left out of the key: `workers` does not change the result, and a
+# warm-started result answers the same request as a cold one.
+_KEYLESS_OPTIONS = ('workers', 'warm_start')
+
+
+def request_cache_key(train_data, non_functional_segments, search_options):
+    """
+    SHA-256 of the canonical train set, closure set and result-affecting
+    search options (seed, restarts, time budget). Dict order, closure order
+    and the rest of the request body (e.g. `name`) do not change the key.
+    """
+    canonical = {
+        'trains': train_data,
+        'closures': sorted(normalize_segments(non_functional_segments)),
+        'options': {key: value for key, value in search_options.items() if key not in _KEYLESS_OPTIONS},
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def _encode_datetime(value):
+    if isinstance(value, datetime):
+        return {'$datetime': value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode_datetime(value):
+    return datetime.fromisoformat(value['$datetime']) if value.keys() == {'$datetime'} else value
+
+
+def encode_result(results):
+    """JSON bytes of an execute_module result, without its `solution` object."""
+    payload = {key: value for key, value in results.items() if key != 'solution'}
+    return json.dumps(payload, separators=(',', ':'), default=_encode_datetime).encode()
+
+
+def decode_result(payload):
+    """
+    Inverse of encode_result. Timeline datetimes are restored, so a cached
+    result renders exactly like a fresh one (timeline pairs become lists).
+    """
+    return json.loads(payload, object_hook=_decode_datetime)
+
+
+class ResultCache:
+    """
+    In-process layer: encoded results keyed by request_cache_key, expiring
+    after `ttl_seconds` and evicting the least recently used beyond
+    `max_entries`.
+    """
+    def __init__(self, max_entries=RESULT_CACHE_MAX_ENTRIES, ttl_seconds=RESULT_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # key -> (expires_at, payload)
+        self.lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'redis_hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, payload):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, payload)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def count(self, outcome):
+        with self.lock:
+            self.stats[outcome] += 1
+        try:
+            get_redis_client().hincrby(REDIS_RESULT_STATS_KEY, outcome, 1)
+        except Exception as e:
+            print(f"WARNING: Could not update result cache stats in Redis. Reason: {e}")
+
+    def snapshot(self):
+        with self.lock:
+            local = dict(self.stats, entries=len(self.entries))
+        try:
+            shared = {key.decode(): int(value) for key, value in
+                      get_redis_client().hgetall(REDIS_RESULT_STATS_KEY).items()}
+        except Exception as e:
+            print(f"WARNING: Could not read result cache stats from Redis. Reason: {e}")
+            shared = None
+        return {'worker': local, 'shared': shared}
+
+
+result_cache = ResultCache()
+
+
+def cached_execute_module(train_data, non_functional_segments=None, progress=None, timer=None, **search_options):
+    """
+    execute_module behind the two cache layers. Returns (results, layer)
+    where layer is 'memory' or 'redis' for a hit and None for a miss.
+    Cached results have no `solution` object. Redis errors degrade to a
+    cache miss. timer, if given, also times the cache lookup and store.
+    """
+    started = time.perf_counter()
+    key = request_cache_key(train_data, non_functional_segments, search_options)
+    payload = result_cache.get(key)
+    if payload is not None:
+        result_cache.count('memory_hits')
+        return _cache_hit(payload, 'memory', timer, started)
+
+    redis_key = f"{REDIS_RESULT_KEY_PREFIX}:{key}"
+    try:
+        payload = get_redis_client().get(redis_key)
+    except Exception as e:
+        print(f"WARNING: Could not read cached result from Redis. Reason: {e}")
+    if payload is not None:
+        result_cache.put(key, payload)
+        result_cache.count('redis_hits')
+        return _cache_hit(payload, 'redis', timer, started)
+
+    result_cache.count('misses')
+    if timer is not None:
+        timer.add('cache', time.perf_counter() - started)
+    results = execute_module(train_data, non_functional_segments, progress=progress, timer=timer, **search_options)
+    started = time.perf_counter()
+    payload = encode_result(results)
+    result_cache.put(key, payload)
+    try:
+        get_redis_client().set(redis_key, payload, ex=RESULT_CACHE_TTL_SECONDS)
+    except Exception as e:
+        print(f"WARNING: Could not store result in Redis. Reason: {e}")
+    if timer is not None:
+        timer.add('cache', time.perf_counter() - started)
+        timer.size('result', len(payload))
+    return results, None
+
+
+def _cache_hit(payload, layer, timer, started):
+    results = decode_result(payload)
+    if timer is not None:
+        timer.add('cache', time.perf_counter() - started)
+    return results, layer
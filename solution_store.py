@@ -0,0 +1,25 @@
+import json
+
+from dashboard_data_manager import get_redis_client
+
+# The decisions of the latest /optimize result, used to warm-start the next.
+REDIS_LAST_SOLUTION_KEY = "optimize_last_solution"
+
+
+def save_last_solution(recommendations):
+    """Stores {train_id: {'action', 'path'}} from a response's recommendations."""
+    decisions = {rec['train_id']: {'action': rec['action'], 'path': rec['path']} for rec in recommendations}
+    try:
+        get_redis_client().set(REDIS_LAST_SOLUTION_KEY, json.dumps(decisions, separators=(',', ':')))
+    except Exception as e:
+        print(f"WARNING: Could not store the last solution in Redis. Reason: {e}")
+
+
+def load_last_solution():
+    """Returns the stored decisions, or None if there are none or Redis is unavailable."""
+    try:
+        stored = get_redis_client().get(REDIS_LAST_SOLUTION_KEY)
+        return json.loads(stored) if stored is not None else None
+    except Exception as e:
+        print(f"WARNING: Could not load the last solution from Redis. Reason: {e}")
+        return None